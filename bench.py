@@ -0,0 +1,226 @@
+''' Microbenchmarks for the hot paths of the rules, run on the headless
+    Game, so no window is needed:
+
+        python bench.py --output bench.json
+
+    Every benchmark runs on three boards: empty, half full (no complete
+    rows), and a stack reaching near the top with an I-sized well, so a
+    drop in it clears several rows at once. Each is timed REPEATS times
+    and the best time per call is kept, like timeit does. The results are
+    written as JSON, to compare one release with the next.
+'''
+
+import json
+import platform
+import sys
+import time
+from random import Random
+from timeit import default_timer
+from game import Game
+from shapes import I_shape, T_shape
+from point import Point
+
+REPEATS = 5
+WELL = 9
+
+
+def fill_empty(width, height):
+    return []
+
+
+def fill_half(width, height):
+    ''' Return value: type: list - (x, y, color) of the bottom half of the
+        board, every row with a hole in it
+    '''
+    rng = Random(1)
+    cells = []
+    for y in range(height / 2, height):
+        hole = rng.randrange(width)
+        cells.extend([(x, y, 'gray') for x in range(width) if x != hole])
+    return cells
+
+
+def fill_near_top(width, height):
+    ''' Return value: type: list - (x, y, color) of a stack up to 4 rows
+        from the top; the bottom 4 rows only miss column WELL, the rows
+        above them have a hole somewhere else too
+    '''
+    rng = Random(2)
+    cells = []
+    for y in range(4, height):
+        holes = [WELL]
+        if y < height - 4:
+            holes.append(rng.randrange(width - 1))
+        cells.extend([(x, y, 'gray') for x in range(width) if x not in holes])
+    return cells
+
+
+FILLS = [('empty', fill_empty), ('half', fill_half), ('near_top', fill_near_top)]
+
+
+def new_game(fill):
+    ''' Parameters: fill - one of the fill functions
+        Return value: type: Game - with the board filled, the current shape
+        still where it was drawn
+    '''
+    game = Game(seed=0)
+    board = game.board
+    board.restore(fill(board.width, board.height), 0, 0)
+    return game
+
+
+def timed(run, calls):
+    ''' Parameters: run - a function of no arguments that makes calls calls;
+                    if it returns a number, that is the seconds to count
+                    instead of the time the whole run took
+                    calls - type: int
+        Return value: type: float - the best seconds per call over REPEATS runs
+    '''
+    best = None
+    for repeat in range(REPEATS):
+        start = default_timer()
+        seconds = run()
+        if seconds is None:
+            seconds = default_timer() - start
+        if best is None or seconds < best:
+            best = seconds
+    return best / calls
+
+
+def bench_board_can_move(fill):
+    game = new_game(fill)
+    board = game.board
+    squares = [(x, y) for y in range(-1, board.height + 1) for x in range(-1, board.width + 1)]
+
+    def run():
+        for i in range(20):
+            for x, y in squares:
+                board.can_move(x, y)
+    return timed(run, 20 * len(squares))
+
+
+def bench_shape_can_move(fill):
+    game = new_game(fill)
+    board = game.board
+    shape = T_shape(Point(board.width / 2, 1))
+
+    def run():
+        for i in range(2000):
+            shape.can_move(board, -1, 0)
+            shape.can_move(board, 1, 0)
+            shape.can_move(board, 0, 1)
+    return timed(run, 6000)
+
+
+def bench_shape_rotate(fill):
+    game = new_game(fill)
+    board = game.board
+    shape = T_shape(Point(board.width / 2, 1))
+
+    def run():
+        for i in range(2000):
+            shape.rotate(board)
+    return timed(run, 2000)
+
+
+def bench_remove_complete_rows(fill):
+    ''' fills the gaps of the bottom 4 rows, then times taking them out '''
+    game = new_game(fill)
+    board = game.board
+    full = [(x, y, 'gray') for y in range(board.height - 4, board.height)
+            for x in range(board.width)]
+    cells = [cell for cell in fill(board.width, board.height)
+             if cell[1] < board.height - 4] + full
+    calls = 200
+
+    def run():
+        seconds = 0.0
+        for i in range(calls):
+            board.restore(cells, 0, 0)
+            start = default_timer()
+            board.remove_complete_rows()
+            seconds += default_timer() - start
+        return seconds
+    return timed(run, calls)
+
+
+def bench_do_move(fill):
+    ''' a vertical I shape moved left and right, then to the right wall and
+        down until it is added to the board; on the near_top board that
+        is WELL, so it clears 4 rows. Adding the shape and making the next
+        one are part of what is timed.
+    '''
+    game = new_game(fill)
+    board = game.board
+    cells = fill(board.width, board.height)
+
+    def play():
+        ''' Return value: type: int - how many times do_move was called '''
+        board.restore(cells, 0, 0)
+        # a vertical I takes the rows from 1 above its center to 2 below
+        shape = I_shape(Point(board.width / 2, 2))
+        assert shape.rotate(board)
+        game.current_shape = shape
+        calls = 0
+        for i in range(board.width):
+            game.do_move('Right')
+            game.do_move('Left')
+            calls += 2
+        while game.do_move('Right'):
+            calls += 1
+        while game.do_move('Down'):
+            calls += 1
+        return calls + 2
+
+    # count the calls in one game first, every game makes the same ones
+    calls = play()
+    if fill is fill_near_top:
+        assert board.score > 0, 'the I shape did not clear the rows'
+
+    def run():
+        for i in range(100):
+            play()
+    return timed(run, 100 * calls)
+
+
+BENCHMARKS = [('Board.can_move', bench_board_can_move),
+              ('Shape.can_move', bench_shape_can_move),
+              ('Shape.rotate', bench_shape_rotate),
+              ('Board.remove_complete_rows', bench_remove_complete_rows),
+              ('Game.do_move', bench_do_move)]
+
+
+def run_all():
+    ''' Return value: type: Dictionary - when and where the benchmarks ran,
+        and for each benchmark and fill the best microseconds per call
+    '''
+    results = []
+    for name, bench in BENCHMARKS:
+        for fill_name, fill in FILLS:
+            seconds = bench(fill)
+            results.append({'benchmark': name, 'fill': fill_name,
+                            'us_per_call': round(seconds * 1e6, 3)})
+    return {'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'repeats': REPEATS,
+            'results': results}
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='microbenchmarks of the game rules')
+    parser.add_argument('--output', default='bench.json')
+    args = parser.parse_args()
+
+    report = run_all()
+    for result in report['results']:
+        print '%-28s %-9s %10.3f us' % (result['benchmark'], result['fill'],
+                                        result['us_per_call'])
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print 'written to', args.output
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+''' Compact board for simulations: the board is just a tuple of row
+    bitmasks, bit x of rows[y] is set when square (x, y) is taken, the same
+    as Board.rows. Nothing here creates Blocks, so a bot can try thousands
+    of placements cheaply.
+'''
+
+from collections import namedtuple
+from random import Random
+from point import Point
+
+
+class Piece:
+    ''' Piece class: every orientation of a shape as bitmasks
+
+        Attributes: shape_class - the Shape subclass this piece comes from
+                    width - type:int - width of the board in squares
+                    orientations - type:list - one Orientation per entry of
+                    shape_class.ROTATIONS
+                    spawn - type:tuple - (orientation, px, py) of a new shape
+                    of this class, where Game draws it
+    '''
+
+    def __init__(self, shape_class, width):
+        self.shape_class = shape_class
+        self.width = width
+        self.orientations = [Orientation(offsets, width) for offsets in shape_class.ROTATIONS]
+        pivot = shape_class(Point(int(width / 2), 0)).get_blocks()[shape_class.PIVOT]
+        self.spawn = (0, pivot.x, pivot.y)
+
+
+class Orientation:
+    ''' Orientation class: one orientation of a piece, placed by the
+        position (px, py) of its pivot block
+
+        Attributes: offsets - type:tuple - (dx, dy) of every block from the pivot
+                    min_dx, max_dx, min_dy, max_dy - type:int - bounds of the offsets
+                    columns - type:list - (dx, lowest dy) for every column the
+                    piece covers, what it lands on
+                    masks - type:dictionary - for every pivot column px where the
+                    piece fits across the board, a tuple of (dy, row mask)
+    '''
+
+    def __init__(self, offsets, width):
+        self.offsets = offsets
+        self.min_dx = min([dx for dx, dy in offsets])
+        self.max_dx = max([dx for dx, dy in offsets])
+        self.min_dy = min([dy for dx, dy in offsets])
+        self.max_dy = max([dy for dx, dy in offsets])
+
+        lowest = {}
+        for dx, dy in offsets:
+            if dy > lowest.get(dx, dy - 1):
+                lowest[dx] = dy
+        self.columns = sorted(lowest.items())
+
+        self.masks = {}
+        for px in range(-self.min_dx, width - self.max_dx):
+            rows = {}
+            for dx, dy in offsets:
+                rows[dy] = rows.get(dy, 0) | (1 << (px + dx))
+            self.masks[px] = tuple(sorted(rows.items()))
+
+
+_pieces = {}
+
+
+def get_piece(shape_class, width):
+    ''' Parameters: shape_class - a Shape subclass
+                    width - type:int
+        Return value: type: Piece
+
+        Pieces only depend on the shape and the board width, so each one
+        is built once and shared.
+    '''
+    key = (shape_class, width)
+    if key not in _pieces:
+        _pieces[key] = Piece(shape_class, width)
+    return _pieces[key]
+
+
+_zobrist = {}
+
+
+def zobrist_keys(width, height):
+    ''' Parameters: width, height - type: int
+        Return value: type: list - keys[y][x] is a random 64 bit number for
+        square (x, y)
+
+        The hash of a board is the XOR of the keys of its taken squares, so
+        taking or freeing a square is one XOR. The keys come from a fixed
+        seed: the same board has the same hash in every process.
+    '''
+    key = (width, height)
+    if key not in _zobrist:
+        rng = Random(width * 1000 + height)
+        _zobrist[key] = [[rng.getrandbits(64) for x in range(width)]
+                         for y in range(height)]
+    return _zobrist[key]
+
+
+def zobrist_hash(rows, keys):
+    ''' Parameters: rows - type: tuple of int
+                    keys - what zobrist_keys returned for this board size
+        Return value: type: int - the hash of the whole board
+    '''
+    h = 0
+    for y in range(len(rows)):
+        row = rows[y]
+        x = 0
+        while row:
+            if row & 1:
+                h ^= keys[y][x]
+            row >>= 1
+            x += 1
+    return h
+
+
+def placement_hash(h, keys, orientation, px, py):
+    ''' Parameters: h - type: int - hash of the board before the placement
+                    keys - what zobrist_keys returned for this board size
+                    orientation - type: Orientation
+                    px, py - type: int - where the pivot block goes
+        Return value: type: int - hash of the board once the piece is in,
+        before any row is cleared
+    '''
+    for dx, dy in orientation.offsets:
+        h ^= keys[py + dy][px + dx]
+    return h
+
+
+def column_heights(rows, width):
+    ''' Parameters: rows - type: tuple of int
+                    width - type: int
+        Return value: type: list - the height of every column, like Board.heights
+    '''
+    height = len(rows)
+    heights = [0] * width
+    seen = 0
+    for y in range(height):
+        new = rows[y] & ~seen
+        if new:
+            seen |= new
+            for x in range(width):
+                if new >> x & 1:
+                    heights[x] = height - y
+    return heights
+
+
+def landing_row(heights, height, orientation, px):
+    ''' Parameters: heights - type: list - column heights of the board
+                    height - type: int - height of the board
+                    orientation - type: Orientation
+                    px - type: int - column of the pivot block
+        Return value: type: int - the row of the pivot block once the piece
+        has been dropped straight down from above the stack, or None if it
+        would stick out of the top of the board
+    '''
+    py = height
+    for dx, dy in orientation.columns:
+        y = height - heights[px + dx] - 1 - dy
+        if y < py:
+            py = y
+    if py + orientation.min_dy < 0:
+        return None
+    return py
+
+
+class BoardState(namedtuple('BoardState', 'rows heights')):
+    ''' BoardState class: an immutable copy of a board, see Board.snapshot
+
+        Attributes: rows - type: tuple of int - the row bitmasks, like Board.rows
+                    heights - type: tuple of int - the column heights, like
+                    Board.heights
+
+        A state is never changed: try_place gives a new one, made from
+        slices of the old rows around the rows the piece touches, so it
+        can be kept and shared as long as needed.
+    '''
+
+    __slots__ = ()
+
+    def try_place(self, orientation, px, py=None):
+        ''' Parameters: orientation - type: Orientation
+                        px - type: int - column of the pivot block
+                        py - type: int - row of the pivot block, None to
+                        drop the piece straight down from above the stack
+            Return value: type: tuple - (new BoardState, number of rows
+            cleared), or None if the piece sticks out of the top when dropped
+
+            the piece is not checked against the taken squares, it has to
+            fit where it goes
+        '''
+        rows = self.rows
+        width = len(self.heights)
+        height = len(rows)
+        if py is None:
+            py = landing_row(self.heights, height, orientation, px)
+            if py is None:
+                return None
+        top = py + orientation.min_dy
+        bottom = py + orientation.max_dy + 1
+        changed = list(rows[top:bottom])
+        for dy, mask in orientation.masks[px]:
+            changed[py + dy - top] |= mask
+
+        full_row = (1 << width) - 1
+        if full_row in changed:
+            kept = tuple([row for row in changed if row != full_row])
+            cleared = len(changed) - len(kept)
+            new = (0,) * cleared + rows[:top] + kept + rows[bottom:]
+            return BoardState(new, tuple(column_heights(new, width))), cleared
+
+        heights = list(self.heights)
+        for dx, dy in orientation.offsets:
+            if height - py - dy > heights[px + dx]:
+                heights[px + dx] = height - py - dy
+        return BoardState(rows[:top] + tuple(changed) + rows[bottom:], tuple(heights)), 0
@@ -1,18 +1,79 @@
-from graphics import Text, Point, CanvasFrame, Line
+import os
+import struct
+from highscores import HighScoreStore
+from bitboard import zobrist_keys, zobrist_hash, column_heights, BoardState
 from block import Block
+from point import Point
+
+
+class BoardListener:
+    ''' BoardListener class:
+        Base class for anything that follows the board, e.g. the Tk view.
+        The board calls these methods whenever its state changes; they all
+        do nothing here, so a listener only overrides the events it needs.
+    '''
+
+    def on_shape_drawn(self, shape):
+        ''' a new shape has appeared on the board '''
+        pass
+
+    def on_shape_moved(self, shape):
+        ''' the shape has been moved or rotated '''
+        pass
+
+    def on_shape_added(self, shape):
+        ''' the shape has been added to the grid and stopped moving '''
+        pass
+
+    def on_rows_removed(self, rows, shift):
+        ''' Parameters: rows - type: list - the complete rows that were deleted
+                        shift - type: list - for every other row y, how many
+                        squares row y has moved down (0 for the deleted rows)
+
+            complete rows have been removed and the rows above them
+            moved down in the grid
+        '''
+        pass
+
+    def on_score_changed(self, score):
+        pass
+
+    def on_delay_changed(self, speed):
+        pass
+
+    def on_game_over(self):
+        pass
+
+    def on_new_record(self, best_score, best_speed):
+        ''' the score beat best_score and best_speed, which were the
+            previous record '''
+        pass
 
 
 class Board:
     ''' Board class: it represents the Tetris board
 
+        The board is only the state of the game, it doesn't draw anything.
+        Whoever wants to display it registers a BoardListener.
+
         Attributes: width - type:int - width of the board in squares
                     height - type:int - height of the board in squares
-                    canvas - type:CanvasFrame - where the pieces will be drawn
                     grid - type:Dictionary - keeps track of the current state of
                     the board; stores the blocks for a given position
+                    rows - type:list - one int per row, bit x is set when
+                    square (x, y) is occupied; this is what collision tests use
+                    full_row - type:int - the value of a row with every square set
+                    heights - type:list - for each column, how high its stack is
+                    in squares, counting from the bottom (0 for an empty column)
+                    row_counts - type:list - for each row, how many squares are taken
+                    hash - type:int - Zobrist hash of the taken squares, see
+                    bitboard.zobrist_keys
+                    listeners - type:list - the BoardListeners to notify
+                    scores - type:HighScoreStore - the high scores, None
+                    unless load_best_result was called
     '''
 
-    def __init__(self, win, width, height):
+    def __init__(self, width, height):
         self.width = width
         self.height = height
 
@@ -20,63 +81,60 @@ class Board:
         self.delta_delay = 0
         self.board_delay = 2000  # ms
 
-        # create a canvas to draw the tetris shapes on
-        self.canvas = CanvasFrame(win, self.width * Block.BLOCK_SIZE * 2,
-                                  self.height * Block.BLOCK_SIZE)
-        self.canvas.setBackground('light gray')
-
-        # draw a vertical line to separate gaming part from info part
-        line = Line(Point(self.width * Block.BLOCK_SIZE, 0), \
-                    Point(self.width * Block.BLOCK_SIZE, self.height * Block.BLOCK_SIZE))
-        line.draw(self.canvas)
-
-        # display rules of the game
-        rules = Text(Point(self.canvas.getWidth() / 1.35, self.canvas.getHeight() / 1.5), \
-                     '        INSTRUCTIONS :            \n\n' + \
-                     '   <- | ->  arrows to move         \n' + \
-                     '     "up" arrow to rotate               \n' + \
-                     '   "down" arrow to move down\n' + \
-                     '       "space" to drop                      \n' + \
-                     '        "p" to pause                           \n' + \
-                     '        "s" to resume                         \n' + \
-                     '   "d" to show debug info          \n\n' + \
-                     '        SCORING :                       \n\n' + \
-                     '     1   point   - 1 row                   \n' + \
-                     '     4   points - 2 rows                  \n' + \
-                     '     9   points - 3 rows                  \n' + \
-                     '    16   points - 4 rows                  \n')
-        rules.draw(self.canvas)
-
-        # set up score counter and text holder for it
+        # set up score counter
         self.score = 0
-        self.score_text = Text(Point(self.canvas.getWidth() / 1.35, \
-                                     self.canvas.getHeight() / 3), 'SCORE : ' + str(self.score))
-        self.score_text.draw(self.canvas)
 
         # speed to display
         self.speed = self.board_delay - self.delta_delay
-        self.speed_text = Text(Point(self.canvas.getWidth() / 1.35, \
-                                     self.canvas.getHeight() / 3.5), 'DROP DOWN DELAY ms : ' + \
-                               str(self.speed))
-        self.speed_text.draw(self.canvas)
-
-        # file handle to read and write best result
-        self.result_file = self.read_best_result()
 
-        # best_score and best speed so far
-        if (self.result_file is not None):
-            lines = self.result_file.readlines()
-
-            self.best_score = int(lines[0])
-            self.best_speed = int(lines[1])
-        else:
-            self.best_score = 0
-            self.best_speed = 0
+        # the high scores, only read by load_best_result
+        self.scores = None
+        self.best_score = 0
+        self.best_speed = 0
 
         # create an empty dictionary
         # currently we have no shapes on the board
         self.grid = {}
 
+        # bitboard: one integer bitmask per row, bit x set means (x, y) is taken
+        self.rows = [0] * self.height
+        self.full_row = (1 << self.width) - 1
+
+        # surface index, kept up to date by add_shape and collapse_rows
+        self.heights = [0] * self.width
+        self.row_counts = [0] * self.height
+
+        # Zobrist hash of the board, kept up to date like the surface index
+        self.zobrist = zobrist_keys(self.width, self.height)
+        self.hash = 0
+
+        self.listeners = []
+
+    def add_listener(self, listener):
+        ''' Parameters: listener - type: BoardListener
+            listener will be notified of every change from now on
+        '''
+        self.listeners.append(listener)
+
+    def load_best_result(self, directory='.'):
+        ''' Parameters: directory - type: string - where the high scores are kept
+
+            read the best score and speed so far from the high score store;
+            simulated games don't call this, so they never touch the files
+        '''
+        try:
+            self.scores = HighScoreStore(directory)
+            self.scores.migrate(os.path.join(directory, 'champion.txt'))
+        except (IOError, OSError, struct.error), e:
+            print 'high score error :', e
+            self.scores = None
+            return
+
+        best = self.scores.best()
+        if best is not None:
+            self.best_score = best.score
+            self.best_speed = best.speed
+
     def draw_shape(self, shape):
         ''' Parameters: shape - type: Shape
             Return value: type: bool
@@ -85,10 +143,77 @@ class Board:
             and returns True, otherwise it returns False
         '''
         if shape.can_move(self, 0, 0):
-            shape.draw(self.canvas)
+            for listener in self.listeners:
+                listener.on_shape_drawn(shape)
+            return True
+        return False
+
+    def move_shape(self, shape, dx, dy):
+        ''' Parameters: shape - type: Shape
+                        dx - type: int
+                        dy - type: int
+            Return value: type: bool
+
+            moves the shape if it can move dx, dy squares and returns True,
+            otherwise it returns False
+        '''
+        if shape.can_move(self, dx, dy):
+            shape.move(dx, dy)
+            for listener in self.listeners:
+                listener.on_shape_moved(shape)
+            return True
+        return False
+
+    def rotate_shape(self, shape):
+        ''' Parameters: shape - type: Shape
+            Return value: type: bool
+
+            rotates the shape if it can be rotated and returns True,
+            otherwise it returns False
+        '''
+        if shape.rotate(self):
+            for listener in self.listeners:
+                listener.on_shape_moved(shape)
             return True
         return False
 
+    def snapshot(self):
+        ''' Return value: type: BoardState - the taken squares and the
+            column heights as they are now, see bitboard.py
+
+            Only the rows and heights are copied, no Block; the state
+            doesn't change when the board does, so a search can try
+            placements on it with BoardState.try_place
+        '''
+        return BoardState(tuple(self.rows), tuple(self.heights))
+
+    def cells(self):
+        ''' Return value: type: list - (x, y, color) of every taken square,
+            what restore takes back
+        '''
+        return [(x, y, block.color) for (x, y), block in sorted(self.grid.items())]
+
+    def restore(self, cells, score, delta_delay):
+        ''' Parameters: cells - type: list - (x, y, color) of every taken square
+                        score - type: int
+                        delta_delay - type: int
+
+            puts the board back the way it was when cells was saved, e.g.
+            from a replay keyframe; listeners are not told
+        '''
+        self.grid = {}
+        self.rows[:] = [0] * self.height
+        self.row_counts[:] = [0] * self.height
+        for x, y, color in cells:
+            self.grid[(x, y)] = Block(Point(x, y), color)
+            self.rows[y] |= 1 << x
+            self.row_counts[y] += 1
+        self.heights[:] = column_heights(self.rows, self.width)
+        self.hash = zobrist_hash(self.rows, self.zobrist)
+        self.score = score
+        self.delta_delay = delta_delay
+        self.speed = self.board_delay - self.delta_delay
+
     def can_move(self, x, y):
         ''' Parameters: x - type:int
                         y - type:int
@@ -104,11 +229,30 @@ class Board:
             3. otherwise return True
 
         '''
-        if x < 0 or x > self.width - 1 or y < 0 or y > self.height - 1 or (x, y) in self.grid.keys():
+        if x < 0 or x > self.width - 1 or y < 0 or y > self.height - 1 or self.rows[y] & (1 << x):
             return False
         else:
             return True
 
+    def can_place(self, cells):
+        ''' Parameters: cells - type: list of (x, y) tuples
+            Return value: type: bool
+
+            checks a whole shape in one go: the cells are OR-ed into one
+            mask per row and every mask is AND-ed against that row of the board
+            Returns True if all the cells are inside the board and free
+        '''
+        masks = {}
+        for x, y in cells:
+            if x < 0 or x > self.width - 1 or y < 0 or y > self.height - 1:
+                return False
+            masks[y] = masks.get(y, 0) | (1 << x)
+        rows = self.rows
+        for y in masks:
+            if rows[y] & masks[y]:
+                return False
+        return True
+
     def add_shape(self, shape):
         ''' Parameter: shape - type:Shape
             add a shape to the grid, i.e.
@@ -117,15 +261,19 @@ class Board:
         '''
         for block in shape.get_blocks():
             self.grid[(block.x, block.y)] = block
+            self.rows[block.y] |= 1 << block.x
+            self.row_counts[block.y] += 1
+            self.hash ^= self.zobrist[block.y][block.x]
+            if self.height - block.y > self.heights[block.x]:
+                self.heights[block.x] = self.height - block.y
+        for listener in self.listeners:
+            listener.on_shape_added(shape)
 
     def update_delay(self):
         ''' update drop down delay '''
         self.speed = self.board_delay - self.delta_delay
-        self.speed_text.undraw()
-        self.speed_text = Text(Point(self.canvas.getWidth() / 1.35, \
-                                     self.canvas.getHeight() / 3.5), 'DROP DOWN DELAY ms : ' + \
-                               str(self.speed))
-        self.speed_text.draw(self.canvas)
+        for listener in self.listeners:
+            listener.on_delay_changed(self.speed)
 
     def update_score(self, n):
         ''' Parameters: n - type: int
@@ -141,72 +289,109 @@ class Board:
             self.score += 9
         elif n == 4:
             self.score += 16
-        # update score text
-        self.score_text.undraw()
-        self.score_text = Text(Point(self.canvas.getWidth() / 1.35, \
-                                     self.canvas.getHeight() / 3), 'SCORE : ' + str(self.score))
-        self.score_text.draw(self.canvas)
-
-    def delete_row(self, y):
-        ''' Parameters: y - type:int
-            remove all the blocks in row y
-            to remove a block you must remove it from the grid
-            and erase it from the screen.
-        '''
-        for x in range(0, self.width):
-            self.grid[(x, y)].undraw()
-            del self.grid[(x, y)]
+        else:
+            # no rows, the score didn't change
+            return
+        for listener in self.listeners:
+            listener.on_score_changed(self.score)
 
     def is_row_complete(self, y):
         ''' Parameter: y - type: int
             Return value: type: bool
 
-            for each block in row y
-            check if there is a block in the grid (use the in operator)
-            if there is one square that is not occupied, return False
-            otherwise return True
+            the row is complete when every square of it is taken
+        '''
+        return self.row_counts[y] == self.width
+
+    def drop_distance(self, cells):
+        ''' Parameters: cells - type: list of (x, y) tuples
+            Return value: type: int
+
+            how many squares the cells can fall before they land.
+            Normally this comes straight from the column heights: the
+            lowest cell in each column can fall down to the top of that
+            column. Only when a cell is already below the top of its column
+            (it slid under an overhang) do we probe row by row.
+        '''
+        lowest = {}
+        for x, y in cells:
+            if y > lowest.get(x, -1):
+                lowest[x] = y
+
+        distance = self.height
+        for x in lowest:
+            top = self.height - self.heights[x]
+            if lowest[x] >= top:
+                distance = 0
+                while self.can_place([(cx, cy + distance + 1) for cx, cy in cells]):
+                    distance += 1
+                return distance
+            distance = min(distance, top - 1 - lowest[x])
+        return distance
+
+    def collapse_rows(self, complete):
+        ''' Parameters: complete - type: list - the complete rows
+
+            removes the complete rows in one pass:
+            1. going from the bottom up, count the complete rows seen so far,
+               that is how far every other row has to move down
+            2. move each row's bitmask and count straight to its final place,
+               then work out the column heights again
+            3. move each remaining block straight to its final place,
+               the blocks of the complete rows are dropped from the grid
         '''
+        shift = [0] * self.height
+        rows = [0] * self.height
+        row_counts = [0] * self.height
+        n = 0
+        for y in range(self.height - 1, -1, -1):
+            if self.rows[y] == self.full_row:
+                n += 1
+            else:
+                shift[y] = n
+                rows[y + n] = self.rows[y]
+                row_counts[y + n] = self.row_counts[y]
+        self.rows[:] = rows
+        self.row_counts[:] = row_counts
+        # nearly every square moved, hash the board again
+        self.hash = zobrist_hash(rows, self.zobrist)
+
+        # column heights: going down from the top, the first row that has
+        # a square in a column we haven't seen yet is the top of that column
+        seen = 0
+        for y in range(0, self.height):
+            new = rows[y] & ~seen
+            if new:
+                for x in range(0, self.width):
+                    if new >> x & 1:
+                        self.heights[x] = self.height - y
+                seen |= new
         for x in range(0, self.width):
-            if (x, y) not in self.grid:
-                return False
-        return True
+            if not seen >> x & 1:
+                self.heights[x] = 0
 
-    def move_down_rows(self, y_start):
-        ''' Parameters: y_start - type:int
-            for each row from y_start to the top
-                for each column
-                    check if there is a block in the grid
-                    if there is, remove it from the grid
-                    and move the block object down on the screen
-                    and then place it back in the grid in the new position
-        '''
-        y = y_start
-        while y >= 0:
-            for x in range(0, self.width):
-                if (x, y) in self.grid:
-                    tb = self.grid[(x, y)]
-                    self.grid[(x, y)].undraw()
-                    del self.grid[(x, y)]
-                    self.grid[(x, y + 1)] = Block(Point(tb.x, tb.y + 1), tb.color)
-                    self.grid[(x, y + 1)].draw(self.canvas)
-            y -= 1
+        grid = {}
+        for (x, y), block in self.grid.iteritems():
+            if y in complete:
+                continue
+            if shift[y]:
+                block.move(0, shift[y])
+            grid[(x, block.y)] = block
+        self.grid = grid
+
+        for listener in self.listeners:
+            listener.on_rows_removed(complete, shift)
 
     def remove_complete_rows(self):
         ''' removes all the complete rows
-            1. for each row, y,
-            2. check if the row is complete
-                if it is,
-                    update complete rows counter
-                    delete the row
-                    move all rows down starting at row y - 1
-               update score
-        '''
-        complete_rows = 0
-        for y in range(0, self.height):
-            if self.is_row_complete(y):
-                complete_rows += 1
-                self.delete_row(y)
-                self.move_down_rows(y - 1)
+            1. find the complete rows
+            2. if there are any, collapse them all at once
+            3. update score
+        '''
+        complete = [y for y in range(0, self.height) if self.is_row_complete(y)]
+        complete_rows = len(complete)
+        if complete_rows != 0:
+            self.collapse_rows(complete)
         self.update_score(complete_rows)
         # increase speed
         if (complete_rows != 0):
@@ -214,33 +399,19 @@ class Board:
             self.update_delay()
 
     def game_over(self):
-        ''' display "Game Over" message in the center of the board
-             use the Text class from the graphics library
-        '''
-        gg = Text(Point(self.canvas.getWidth() / 2, self.canvas.getHeight() / 2), 'GAME OVER')
-        gg.draw(self.canvas)
+        ''' tell the listeners the game is over and save the result '''
+        for listener in self.listeners:
+            listener.on_game_over()
         self.save_result()
 
     def save_result(self):
-        ''' save current score and drop down speed in a champion.txt file'''
-        if (self.score > self.best_score):
-            self.result_file = self.read_best_result()
-            self.result_file.truncate(0)  # erase file info
-            self.result_file.write(str(self.score) + '\n' + str(self.speed))
-            self.result_file.close()
-            congrats = Text(Point(self.canvas.getWidth() / 4, self.canvas.getHeight() / 4), 'CONGRATULATIONS\n' + \
-                            'YOU ARE THE NEW CHAMPION\nprevious best result: \nscore = %d\n speed = %d' % \
-                            (self.best_score, self.best_speed))
-            congrats.draw(self.canvas)
-        else:
-            self.result_file.close()
-
-    def read_best_result(self):
-        ''' read previous result to determine if current result is better and
-            needs to be saved'''
+        ''' add the current score and drop down speed to the high scores '''
+        if self.scores is None:
+            return
         try:
-            r_file = open('./champion.txt', 'r+')
-        except IOError, e:
-            print 'file open error :', e
-            return None
-        return r_file
+            self.scores.add(self.score, self.speed)
+        except (IOError, OSError, struct.error), e:
+            print 'high score error :', e
+        if self.score > self.best_score:
+            for listener in self.listeners:
+                listener.on_new_record(self.best_score, self.best_speed)
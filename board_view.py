@@ -0,0 +1,231 @@
+from timeit import default_timer
+from graphics import Text, Point, CanvasFrame, Line
+from board import BoardListener
+
+
+class BoardView(BoardListener):
+    ''' BoardView class: draws a Board on a Tk canvas
+
+        The view subscribes to the board and mirrors every change on screen,
+        the board itself knows nothing about Tk.
+
+        Attributes: board - type:Board - the board being displayed
+                    canvas - type:CanvasFrame - where the pieces will be drawn
+                    items - type:Dictionary - for each block of the moving
+                    shape, the id of its canvas rectangle and the (x, y)
+                    square it was drawn at
+
+        The rectangles are borrowed from the canvas' pool and given back
+        to it, so the view never creates or deletes canvas items once the
+        pool is filled. The rectangles of the moving shape are tagged
+        'shape'. Once a shape is added to the board its rectangles are only
+        known to the canvas, tagged with the row they are in, so a whole row
+        can be moved or given back with a single canvas call.
+    '''
+
+    BLOCK_SIZE = 30
+    OUTLINE_WIDTH = 1
+
+    def __init__(self, win, board):
+        self.board = board
+
+        # create a canvas to draw the tetris shapes on
+        self.canvas = CanvasFrame(win, board.width * self.BLOCK_SIZE * 2,
+                                  board.height * self.BLOCK_SIZE)
+        self.canvas.setBackground('light gray')
+
+        # draw a vertical line to separate gaming part from info part
+        line = Line(Point(board.width * self.BLOCK_SIZE, 0), \
+                    Point(board.width * self.BLOCK_SIZE, board.height * self.BLOCK_SIZE))
+        line.draw(self.canvas)
+
+        # display rules of the game
+        rules = Text(Point(self.canvas.getWidth() / 1.35, self.canvas.getHeight() / 1.5), \
+                     '        INSTRUCTIONS :            \n\n' + \
+                     '   <- | ->  arrows to move         \n' + \
+                     '     "up" arrow to rotate               \n' + \
+                     '   "down" arrow to move down\n' + \
+                     '       "space" to drop                      \n' + \
+                     '        "p" to pause                           \n' + \
+                     '        "s" to resume                         \n' + \
+                     '   "d" to show debug info          \n' + \
+                     '     "b" to let the bot play          \n' + \
+                     '   "o" to show performance       \n' + \
+                     ' "-" / "+" for slower / faster     \n\n' + \
+                     '        SCORING :                       \n\n' + \
+                     '     1   point   - 1 row                   \n' + \
+                     '     4   points - 2 rows                  \n' + \
+                     '     9   points - 3 rows                  \n' + \
+                     '    16   points - 4 rows                  \n')
+        rules.draw(self.canvas)
+
+        # set up text holder for the score
+        self.score_text = Text(Point(self.canvas.getWidth() / 1.35, \
+                                     self.canvas.getHeight() / 3), 'SCORE : ' + str(board.score))
+        self.score_text.draw(self.canvas)
+
+        # speed to display
+        self.speed_text = Text(Point(self.canvas.getWidth() / 1.35, \
+                                     self.canvas.getHeight() / 3.5), 'DROP DOWN DELAY ms : ' + \
+                               str(board.speed))
+        self.speed_text.draw(self.canvas)
+
+        # enough rectangles for a full board and the moving shape
+        self.canvas.fillRectanglePool(board.width * board.height + 4)
+
+        # from here on, everything one move or line clear changes on the
+        # canvas is sent to Tk in one go when Tk is idle
+        self.canvas.setAutoflush(False)
+
+        self.items = {}
+        board.add_listener(self)
+
+    def draw_block(self, block):
+        ''' Parameters: block - type: Block
+            borrow a rectangle for block and put it on the block's square
+        '''
+        x = block.x * self.BLOCK_SIZE + self.OUTLINE_WIDTH
+        y = block.y * self.BLOCK_SIZE + self.OUTLINE_WIDTH
+        item = self.canvas.borrowRectangle(x, y, x + self.BLOCK_SIZE, y + self.BLOCK_SIZE,
+                                           {'fill': block.color, 'width': self.OUTLINE_WIDTH,
+                                            'tags': ('shape',)})
+        self.items[block] = [item, block.x, block.y]
+
+    def move_block(self, block):
+        ''' Parameters: block - type: Block
+            move the rectangle of block to the square the block is at now
+        '''
+        entry = self.items[block]
+        if (entry[1], entry[2]) != (block.x, block.y):
+            x = block.x * self.BLOCK_SIZE + self.OUTLINE_WIDTH
+            y = block.y * self.BLOCK_SIZE + self.OUTLINE_WIDTH
+            self.canvas.moveItemTo(entry[0], x, y, x + self.BLOCK_SIZE, y + self.BLOCK_SIZE)
+            entry[1] = block.x
+            entry[2] = block.y
+
+    def row_tag(self, y):
+        ''' Return value: type: string - the canvas tag of the blocks in row y '''
+        return 'row%d' % y
+
+    def on_shape_drawn(self, shape):
+        for block in shape.get_blocks():
+            self.draw_block(block)
+
+    def on_shape_moved(self, shape):
+        blocks = shape.get_blocks()
+        entry = self.items[blocks[0]]
+        dx = blocks[0].x - entry[1]
+        dy = blocks[0].y - entry[2]
+        for block in blocks:
+            entry = self.items[block]
+            if (block.x - entry[1], block.y - entry[2]) != (dx, dy):
+                # rotated, every block goes somewhere else
+                for other in blocks:
+                    self.move_block(other)
+                return
+        # the whole shape moved the same way, one call moves it
+        self.canvas.moveItems('shape', dx * self.BLOCK_SIZE, dy * self.BLOCK_SIZE)
+        for block in blocks:
+            entry = self.items[block]
+            entry[1] = block.x
+            entry[2] = block.y
+
+    def on_shape_added(self, shape):
+        for block in shape.get_blocks():
+            self.canvas.setTag(self.items.pop(block)[0], self.row_tag(block.y))
+
+    def on_rows_removed(self, rows, shift):
+        for y in rows:
+            self.canvas.returnRectangles(self.row_tag(y))
+        # bottom up, so a row is always moved into a row that is already empty
+        for y in range(self.board.height - 1, -1, -1):
+            if shift[y]:
+                self.canvas.moveItems(self.row_tag(y), 0, shift[y] * self.BLOCK_SIZE)
+                self.canvas.setTag(self.row_tag(y), self.row_tag(y + shift[y]))
+
+    def on_score_changed(self, score):
+        self.score_text.setText('SCORE : ' + str(score))
+
+    def on_delay_changed(self, speed):
+        self.speed_text.setText('DROP DOWN DELAY ms : ' + str(speed))
+
+    def on_game_over(self):
+        ''' display "Game Over" message in the center of the board
+             use the Text class from the graphics library
+        '''
+        gg = Text(Point(self.canvas.getWidth() / 2, self.canvas.getHeight() / 2), 'GAME OVER')
+        gg.draw(self.canvas)
+
+    def on_new_record(self, best_score, best_speed):
+        congrats = Text(Point(self.canvas.getWidth() / 4, self.canvas.getHeight() / 4), 'CONGRATULATIONS\n' + \
+                        'YOU ARE THE NEW CHAMPION\nprevious best result: \nscore = %d\n speed = %d' % \
+                        (best_score, best_speed))
+        congrats.draw(self.canvas)
+
+
+class PerformanceOverlay:
+    ''' PerformanceOverlay class: live numbers about the game, on the info
+        panel above the score: ticks per second, mean and p99 tick cost,
+        canvas items and the Blocks of the game. Canvas items that are not
+        pooled are the Blocks and the texts, so when they grow apart in a
+        long game the view is leaking items.
+
+        Attributes: win - type:Window - to plan the refreshes on
+                    canvas - type:CanvasFrame - where the text goes
+                    stats - type:Instrumentation - where the tick costs come from
+                    game - type:Game - whose Blocks are counted
+                    text - type:Text - the overlay, drawn while it is shown
+                    job - the planned refresh, None while hidden
+
+        The text is refreshed every REFRESH_MS, outside the ticks so it
+        doesn't count in their cost, and changed in place with setText.
+    '''
+
+    REFRESH_MS = 500
+
+    def __init__(self, win, canvas, stats, game):
+        self.win = win
+        self.canvas = canvas
+        self.stats = stats
+        self.game = game
+        self.text = Text(Point(canvas.getWidth() / 1.35, canvas.getHeight() / 8), '')
+        self.job = None
+        self.ticks = 0
+        self.time = 0.0
+
+    def shown(self):
+        return self.job is not None
+
+    def toggle(self):
+        ''' show the overlay if it is hidden, hide it otherwise '''
+        if self.shown():
+            self.win.after_cancel(self.job)
+            self.job = None
+            self.text.undraw()
+        else:
+            self.ticks = self.stats.tick_cost.count
+            self.time = default_timer()
+            self.text.setText('')
+            self.text.draw(self.canvas)
+            self.job = self.win.after(self.REFRESH_MS, self.refresh)
+
+    def count_blocks(self):
+        ''' Return value: type:int - the Blocks on the board and in the
+            current and next shapes
+        '''
+        game = self.game
+        return (len(game.board.grid) + len(game.current_shape.get_blocks()) +
+                len(game.next_shape.get_blocks()))
+
+    def refresh(self):
+        now = default_timer()
+        cost = self.stats.tick_cost
+        rate = (cost.count - self.ticks) / (now - self.time)
+        self.ticks = cost.count
+        self.time = now
+        self.text.setText('ticks/s : %.1f\n' % rate +
+                          'tick ms : mean %.2f  p99 <= %.2f\n' % (cost.mean(), cost.percentile(99)) +
+                          'canvas items : %d (%d pooled)\n' % (self.canvas.getItemCount(),
+                                                                self.canvas.getPooledCount()) +
+                          'game Blocks : %d' % self.count_blocks())
+        self.job = self.win.after(self.REFRESH_MS, self.refresh)
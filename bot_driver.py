@@ -0,0 +1,125 @@
+''' Bot driver: lets the bot think in a separate process while the Tk loop
+    keeps running, so a deep search never freezes input or rendering.
+
+    The Tk side sends a snapshot of the board (Board.snapshot), its hash
+    and the pieces, and goes on. The worker searches it again and
+    again, first with a narrow beam and then wider and deeper, and sends
+    back the best move after every pass. When the tick comes, the Tk side
+    takes the last move that arrived, however far the search got.
+    A process rather than a thread is used because a thread would hold the
+    interpreter lock while it searches, and so slow down the Tk loop.
+'''
+
+import multiprocessing
+from Queue import Empty
+from bitboard import zobrist_keys
+from movegen import shape_state
+from tetris_board_eval_function import Bot
+
+
+def search_plan(beam_width, lookahead):
+    ''' Parameters: beam_width, lookahead - type:int - how far the last pass goes
+        Return value: type:list - (beam width, lookahead) of every pass,
+        cheapest first
+    '''
+    plan = []
+    width = 1
+    while width < beam_width:
+        plan.append((width, 0))
+        width *= 2
+    for depth in range(lookahead + 1):
+        plan.append((beam_width, depth))
+    return plan
+
+
+def think(requests, results, width, options):
+    ''' Parameters: requests - type:Queue - snapshots to search, None to stop
+                    results - type:Queue - (job, move) after every pass
+                    width - type:int - width of the board
+                    options - type:Dictionary - keyword arguments for Bot
+
+        the worker process: only the newest snapshot is searched, and a
+        search is dropped as soon as a newer one arrives
+    '''
+    bot = Bot('bot', width=width, **options)
+    plan = search_plan(bot.beam_width, bot.lookahead)
+    request = requests.get()
+    while request is not None:
+        try:
+            while True:
+                request = requests.get_nowait()
+                if request is None:
+                    return
+        except Empty:
+            pass
+        job, state, h, pieces, start = request
+        keys = zobrist_keys(width, len(state.rows))
+        for beam_width, lookahead in plan:
+            if not requests.empty():
+                break
+            bot.beam_width = beam_width
+            bot.lookahead = lookahead
+            node = bot.search(state, h, pieces, keys, start)
+            results.put((job, node[4] if node is not None else None))
+            if node is None:
+                break
+        request = requests.get()
+
+
+class BotDriver:
+    ''' BotDriver class: runs a Bot in a worker process for the Tk game
+
+        Attributes: width - type:int - width of the board
+                    job - type:int - number of the last snapshot sent
+                    shape - type:Shape - the shape the last snapshot was for
+                    best - the best move found so far for it, see
+                    Bot.find_a_position_for_current_shape, or None
+                    process - type:Process - the worker
+    '''
+
+    def __init__(self, width, options=None):
+        self.width = width
+        self.job = 0
+        self.shape = None
+        self.best = None
+        self.requests = multiprocessing.Queue()
+        self.results = multiprocessing.Queue()
+        self.process = multiprocessing.Process(target=think,
+                                               args=(self.requests, self.results, width,
+                                                     options or {}))
+        # never keep the game from exiting
+        self.process.daemon = True
+        self.process.start()
+
+    def think(self, board, current_shape, next_shape):
+        ''' Parameters: board - type:Board
+                        current_shape, next_shape - type:Shape
+
+            send a snapshot of the board to the worker and return at once;
+            whatever it was searching before is dropped
+        '''
+        self.job += 1
+        self.shape = current_shape
+        self.best = None
+        self.requests.put((self.job, board.snapshot(), board.hash,
+                           [current_shape.__class__, next_shape.__class__],
+                           shape_state(current_shape)))
+
+    def collect(self):
+        ''' Return value: the best move the worker has found so far for the
+            last snapshot, or None if it hasn't finished a pass yet
+        '''
+        while True:
+            try:
+                job, move = self.results.get_nowait()
+            except Empty:
+                break
+            if job == self.job:
+                self.best = move
+        return self.best
+
+    def stop(self):
+        ''' tell the worker to finish, without waiting for it '''
+        self.job += 1
+        self.shape = None
+        self.requests.put(None)
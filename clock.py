@@ -0,0 +1,95 @@
+''' The clock of the Tk game: calls a tick function at a fixed interval,
+    on Tk's after, with only ever one tick planned.
+
+    Every tick is planned for an absolute deadline, the last deadline plus
+    the interval, not for the interval after the last tick ended; so the
+    time a tick takes, or how late Tk runs it, is taken off the wait for
+    the next one instead of adding up.
+'''
+
+import math
+from timeit import default_timer
+
+SLOWEST = 0.125
+FASTEST = 8.0
+
+
+class GameClock:
+    ''' GameClock class: calls tick every interval() ms, scaled by time_scale
+
+        Attributes: win - type:Window - to plan the ticks on
+                    tick - a function of no arguments
+                    interval - a function of no arguments that returns the
+                    ms from one tick to the next at normal speed
+                    time_scale - type:float - 2 for twice as fast, 0.5 for
+                    half as fast
+                    deadline - type:float - when the next tick should come,
+                    in default_timer seconds, None while stopped
+                    job - the planned tick, None while stopped or ticking
+
+        A tick more than a whole interval late doesn't make the next ones
+        come in a burst: the clock starts again from that tick.
+    '''
+
+    def __init__(self, win, tick, interval, time_scale=1.0):
+        self.win = win
+        self.tick = tick
+        self.interval = interval
+        self.time_scale = time_scale
+        self.deadline = None
+        self.job = None
+
+    def running(self):
+        return self.deadline is not None
+
+    def period(self):
+        ''' Return value: type:float - seconds from one tick to the next '''
+        return self.interval() / 1000.0 / self.time_scale
+
+    def start(self):
+        ''' plan the first tick an interval from now, unless the clock is
+            already running
+        '''
+        if self.running():
+            return
+        self.deadline = default_timer() + self.period()
+        self.plan()
+
+    def stop(self):
+        ''' cancel the planned tick; can be called from tick '''
+        if self.job is not None:
+            self.win.after_cancel(self.job)
+            self.job = None
+        self.deadline = None
+
+    def set_time_scale(self, time_scale):
+        ''' Parameters: time_scale - type:float - kept between SLOWEST and FASTEST
+
+            the wait left for the planned tick is scaled too
+        '''
+        time_scale = min(max(time_scale, SLOWEST), FASTEST)
+        if self.running():
+            now = default_timer()
+            left = max(self.deadline - now, 0.0)
+            self.deadline = now + left * self.time_scale / time_scale
+            self.win.after_cancel(self.job)
+            self.time_scale = time_scale
+            self.plan()
+        else:
+            self.time_scale = time_scale
+
+    def plan(self):
+        ''' ask Tk to run fire at deadline '''
+        ms = (self.deadline - default_timer()) * 1000
+        self.job = self.win.after(max(int(math.ceil(ms)), 0), self.fire)
+
+    def fire(self):
+        self.job = None
+        self.tick()
+        if not self.running():
+            return
+        now = default_timer()
+        self.deadline += self.period()
+        if self.deadline < now:
+            self.deadline = now + self.period()
+        self.plan()
@@ -0,0 +1,164 @@
+''' Dataset of bot placements, to fit the Bot's weights offline.
+
+    A dataset file is a header and then one fixed size record per sample,
+    only ever appended to:
+
+        header - HEADER: MAGIC, VERSION, board width, board height
+        record - the board before the placement, bit packed: bit
+                 y * width + x of the number is square (x, y), stored in
+                 board_bytes(width, height) bytes, big end first
+                 (25 bytes for 10x20); then, one byte each, the shape (its
+                 index in Game.SHAPES), the orientation, x and y of the
+                 placement and the rows it cleared; then, as an int32, the
+                 outcome: the points the game scored from there to its end
+
+    read_dataset maps the file with numpy.memmap, so the records are read
+    from disk as they are used and the dataset never has to fit in memory.
+
+        python selfplay.py --games 1000 --dataset placements.data
+'''
+
+import binascii
+import os
+import struct
+
+try:
+    import numpy
+except ImportError:
+    # only the reader needs it
+    numpy = None
+
+MAGIC = 'TTDS'
+VERSION = 1
+HEADER = struct.Struct('<4sHBB')
+
+
+def board_bytes(width, height):
+    ''' Return value: type: int - bytes a packed board takes '''
+    return (width * height + 7) // 8
+
+
+_structs = {}
+
+
+def record_struct(width, height):
+    ''' Return value: type: struct.Struct - one record for this board size '''
+    if (width, height) not in _structs:
+        _structs[width, height] = struct.Struct('<%dsBBBBBi' % board_bytes(width, height))
+    return _structs[width, height]
+
+
+def record_dtype(width, height):
+    ''' Return value: type: numpy.dtype - the same record, for numpy '''
+    return numpy.dtype([('board', 'u1', (board_bytes(width, height),)),
+                        ('piece', 'u1'), ('orientation', 'u1'), ('x', 'u1'), ('y', 'u1'),
+                        ('lines', 'u1'), ('outcome', '<i4')])
+
+
+def pack_board(rows, width):
+    ''' Parameters: rows - type: tuple of int - row bitmasks, like Board.rows
+                    width - type: int
+        Return value: type: string - the board in board_bytes bytes
+    '''
+    value = 0
+    for y in range(len(rows)):
+        value |= rows[y] << (y * width)
+    return binascii.unhexlify('%0*x' % (board_bytes(width, len(rows)) * 2, value))
+
+
+def pack_sample(rows, width, piece, orientation, x, y, lines, outcome):
+    ''' Parameters: rows - type: tuple of int - the board before the placement
+                    width - type: int
+                    piece - type: int - index in Game.SHAPES
+                    orientation, x, y - type: int - the placement
+                    lines - type: int - rows it cleared
+                    outcome - type: int - points scored from there on
+        Return value: type: string - the record
+    '''
+    return record_struct(width, len(rows)).pack(pack_board(rows, width), piece,
+                                                 orientation, x, y, lines, outcome)
+
+
+class DatasetWriter:
+    ''' DatasetWriter class: appends samples to a dataset file
+
+        Attributes: path - type: string
+                    width, height - type: int - the board size of every sample
+                    record - type: struct.Struct - one record
+                    count - type: int - samples written by this writer
+
+        A new file gets a header first; an old one has to be for the same
+        board size. Samples only reach the file in append calls, one whole
+        game at a time, once its outcome is known.
+    '''
+
+    def __init__(self, path, width, height):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.record = record_struct(width, height)
+        self.count = 0
+        self.file = open(path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(HEADER.pack(MAGIC, VERSION, width, height))
+        elif read_header(path) != (width, height):
+            self.file.close()
+            raise ValueError('%s holds boards of another size' % path)
+        else:
+            # drop a record cut short when the last writer stopped
+            extra = (self.file.tell() - HEADER.size) % self.record.size
+            if extra:
+                self.file.truncate(self.file.tell() - extra)
+
+    def append(self, records):
+        ''' Parameters: records - type: list of strings - from pack_sample '''
+        self.file.write(''.join(records))
+        self.file.flush()
+        self.count += len(records)
+
+    def close(self):
+        self.file.close()
+
+
+def read_header(path):
+    ''' Return value: type: tuple - (width, height) of the dataset at path '''
+    with open(path, 'rb') as f:
+        magic, version, width, height = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('%s is not a dataset this version can read' % path)
+    return width, height
+
+
+def read_dataset(path):
+    ''' Parameters: path - type: string - a dataset file
+        Return value: type: numpy.memmap - one element of record_dtype per
+        sample, read only; a record cut short at the end is left out
+    '''
+    if numpy is None:
+        raise ImportError('read_dataset needs numpy')
+    width, height = read_header(path)
+    dtype = record_dtype(width, height)
+    count = (os.path.getsize(path) - HEADER.size) // dtype.itemsize
+    if count == 0:
+        return numpy.zeros(0, dtype)
+    return numpy.memmap(path, dtype, 'r', HEADER.size, (count,))
+
+
+def unpack_boards(records, width, height):
+    ''' Parameters: records - a slice of what read_dataset returned
+                    width, height - type: int - the board size
+        Return value: numpy array of shape (n, height, width), 1 for a
+        taken square, what Bot.evaluate_batch takes
+    '''
+    bits = numpy.unpackbits(records['board'], axis=1)[:, ::-1]
+    return bits[:, :width * height].reshape(-1, height, width)
+
+
+def batches(records, size):
+    ''' Parameters: records - what read_dataset returned
+                    size - type: int - samples per batch
+        Return value: a generator of slices of records, views on the file
+        with nothing copied
+    '''
+    for start in range(0, len(records), size):
+        yield records[start:start + size]
@@ -0,0 +1,180 @@
+from random import Random
+from shapes import *
+from board import Board
+from bitboard import get_piece
+from movegen import find_path, shape_state, ROTATE
+import replay
+
+
+class Game:
+    ''' Game class: the rules of the game, without any graphics
+        It can be played headless, e.g. by a bot, or driven by the
+        Tetris class which adds the window, keyboard and animation.
+
+        Attributes:
+            SHAPES - type: list (list of Shape classes)
+            DIRECTION - type: dictionary - converts string direction to (dx, dy)
+            BOARD_WIDTH - type:int - the width of the board
+            BOARD_HEIGHT - type:int - the height of the board
+            board - type:Board - the tetris board
+            rng - type:Random - where the shapes come from, seed it to
+            get the same sequence of shapes every time
+            current_shape - type: Shape - the current moving shape on the board
+            next_shape - type: Shape - the shape that comes after it
+            over - type: bool - True once a new shape could not be drawn
+            recorder - type: Recorder - where the replay of the game is
+            written, None to play without one; see replay.py
+            KEYS - type: tuple - the keys that play the game, see apply_key
+    '''
+
+    SHAPES = [I_shape, J_shape, L_shape, O_shape, S_shape, T_shape, Z_shape]
+    DIRECTION = {'Left': (-1, 0), 'Right': (1, 0), 'Down': (0, 1)}
+    BOARD_WIDTH = 10
+    BOARD_HEIGHT = 20
+    KEYS = ('Left', 'Right', 'Down', 'Up', 'space')
+
+    def __init__(self, board=None, seed=None, recorder=None):
+        ''' Parameters: board - type: Board - pass one in to register listeners
+                        on it before the first shape is drawn
+                        seed - type: hashable - seed for the shape sequence
+                        recorder - type: Recorder - to record a replay
+        '''
+        if board is None:
+            board = Board(self.BOARD_WIDTH, self.BOARD_HEIGHT)
+        self.board = board
+        self.rng = Random(seed)
+        self.over = False
+        self.recorder = recorder
+
+        # create next shape to be displayed
+        self.next_shape = self.create_new_shape()
+
+        # set the current shape to a random new shape
+        self.current_shape = self.create_new_shape()
+
+        # Draw the current_shape on the board
+        self.board.draw_shape(self.current_shape)
+
+    def create_new_shape(self):
+        ''' Return value: type: Shape
+
+            Create a random new shape that is centered
+             at y = 0 and x = int(self.BOARD_WIDTH/2)
+            return the shape
+        '''
+        # pick a random number from the SHAPES list attribute of the tetris class
+        # create new shape
+        shape_class = self.rng.choice(self.SHAPES)
+        self.record(replay.PIECE, self.SHAPES.index(shape_class))
+        return shape_class(Point(int(self.BOARD_WIDTH / 2), 0))
+
+    def record(self, kind, value=0):
+        ''' Parameters: kind, value - type: int - an event, see replay.py
+
+            add the event to the replay, if the game is being recorded
+        '''
+        if self.recorder is not None:
+            self.recorder.record(kind, value)
+
+    def stop_recording(self):
+        ''' close the replay, nothing more is recorded after it '''
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
+    def do_move(self, direction):
+        ''' Parameters: direction - type: string
+            Return value: type: bool
+
+            Move the current shape in the direction specified by the parameter:
+            First check if the shape can move. If it can, move it and return True
+            Otherwise if the direction we tried to move was 'Down',
+            1. add the current shape to the board
+            2. remove the completed rows if any
+            3. create a new random shape and set current_shape attribute
+            4. If the shape cannot be drawn on the board, the game is over
+
+            return False
+
+        '''
+        tup = self.DIRECTION[direction]
+        dx = tup[0]
+        dy = tup[1]
+        if self.board.move_shape(self.current_shape, dx, dy):
+            return True
+        elif tup == (0, 1):
+            self.board.add_shape(self.current_shape)
+            self.current_shape = self.next_shape
+            self.next_shape = self.create_new_shape()
+            if self.board.draw_shape(self.current_shape):
+                self.board.remove_complete_rows()
+            else:
+                self.over = True
+                self.board.game_over()
+                self.record(replay.GAME_OVER, self.board.score)
+                self.stop_recording()
+        return False
+
+    def hard_drop(self):
+        ''' move the current shape straight down to where it lands, in one
+            move, and then add it to the board like do_move('Down') does
+        '''
+        cells = [(block.x, block.y) for block in self.current_shape.get_blocks()]
+        distance = self.board.drop_distance(cells)
+        if distance:
+            self.board.move_shape(self.current_shape, 0, distance)
+        self.do_move('Down')
+
+    def place_shape(self, orientation, x, y=None):
+        ''' Parameters: orientation - type: int - index in the shape's ROTATIONS
+                        x - type: int - column for the pivot block
+                        y - type: int - row the pivot block lands in, if known
+
+            play a placement chosen by a bot the way a player would:
+            rotate the current shape (moving it down a square when it is
+            too close to the top to turn), slide it one square at a time
+            to column x, and drop it.
+            With y, the shape follows the shortest path of moves to the
+            landing instead, which can slide it under an overhang; see
+            movegen.py
+        '''
+        shape = self.current_shape
+        board = self.board
+        if y is not None:
+            path = find_path(tuple(board.rows), get_piece(shape.__class__, board.width),
+                             shape_state(shape), (orientation, x, y))
+            if path is not None:
+                for move in path:
+                    if move == ROTATE:
+                        board.rotate_shape(shape)
+                    else:
+                        board.move_shape(shape, *self.DIRECTION[move])
+                self.do_move('Down')
+                return
+        while shape.orientation != orientation:
+            if not board.rotate_shape(shape) and not board.move_shape(shape, 0, 1):
+                break
+        pivot = shape.get_blocks()[shape.PIVOT]
+        step = 1 if x > pivot.x else -1
+        while pivot.x != x and board.move_shape(shape, step, 0):
+            pass
+        self.hard_drop()
+
+    def apply_key(self, key):
+        ''' Parameters: key - type: string - one of KEYS
+
+            play a key: the arrows move the shape, "Up" rotates it
+            and "space" drops it
+        '''
+        if key == 'Up':
+            self.do_rotate()
+        elif key == 'space':
+            self.hard_drop()
+        else:
+            self.do_move(key)
+
+    def do_rotate(self):
+        ''' Checks if the current_shape can be rotated and
+            rotates if it can
+        '''
+        self.board.rotate_shape(self.current_shape)
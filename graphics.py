@@ -59,6 +59,12 @@ Programming: An Introduction to Computer Science" by John Zelle,
 published by Franklin, Beedle & Associates.  Also see
 http://mcsp.wartburg.edu/zelle/python for a quick reference"""
 
+# CanvasFrame.setAutoflush(False) queues item changes and sends them to
+#     Tk in one pass from after_idle.
+# Text.setText changes the text of the drawn item in place and does
+#     nothing when the text is the same; _reconfig only sends the option
+#     that changed to Tk.
+#
 # Version 3.5 5/10/09
 # Removed all the threading crap and cleaned up the _root stuff
 #
@@ -175,6 +181,12 @@ class CanvasFrame(tk.Frame):
         self._keyboardCallback = None
         self.trans = None
         self.closed = False
+        # ids of hidden rectangle items waiting to be borrowed again
+        self._rectPool = []
+        # with autoflush off, canvas changes wait here for the next idle
+        self.autoflush = True
+        self._pending = []
+        self._flushScheduled = False
         parent.lift()
 
     def __checkOpen(self):
@@ -218,8 +230,101 @@ class CanvasFrame(tk.Frame):
     def flush(self):
         """Update drawing to the window"""        
         self.__checkOpen()
+        self._applyPending()
         self.update_idletasks()
-        
+
+    def setAutoflush(self, autoflush):
+        """With autoflush on (the default) every change to an item is
+        sent to Tk right away. With it off, moves, reconfigurations and
+        deletions are queued and sent in one pass when Tk is next idle,
+        or when flush is called, so a burst of changes costs one repaint.
+        Creating an item still happens right away, since its id is needed."""
+        self.autoflush = autoflush
+        if autoflush:
+            self._applyPending()
+
+    def _call(self, func, *args):
+        # Internal method: call func(*args) now, or queue it if autoflush is off
+        if self.autoflush:
+            func(*args)
+            return
+        pending = self._pending
+        if func == self.canvas.move and pending and pending[-1][0] == func \
+                and pending[-1][1][0] == args[0]:
+            # two moves of the same items in a row add up to one
+            item, x, y = pending[-1][1]
+            pending[-1] = (func, (item, x + args[1], y + args[2]))
+        else:
+            pending.append((func, args))
+        if not self._flushScheduled:
+            self._flushScheduled = True
+            self.after_idle(self._applyPending)
+
+    def _applyPending(self):
+        # Internal method: send the queued changes to Tk, in order
+        self._flushScheduled = False
+        pending = self._pending
+        self._pending = []
+        if self.closed:
+            return
+        for func, args in pending:
+            func(*args)
+
+    def setTag(self, item, tag):
+        """Replace all the tags of the items tagged item with tag"""
+        self._call(self.canvas.itemconfig, item, {'tags': (tag,)})
+
+    def moveItems(self, item, dx, dy):
+        """Move every item tagged item by dx, dy screen units with a
+        single canvas call"""
+        self._call(self.canvas.move, item, dx, dy)
+
+    def moveItemTo(self, item, x1, y1, x2, y2):
+        """Set the bounding box of item to (x1,y1), (x2,y2)"""
+        self._call(self.canvas.coords, item, x1, y1, x2, y2)
+
+    def fillRectanglePool(self, n):
+        """Create hidden rectangles up front until the pool holds n of
+        them, so borrowRectangle doesn't have to create any"""
+        while len(self._rectPool) < n:
+            self._rectPool.append(self.canvas.create_rectangle(
+                0, 0, 0, 0, state='hidden', tags=('pool',)))
+
+    def borrowRectangle(self, x1, y1, x2, y2, options):
+        """Return the id of a visible rectangle at (x1,y1), (x2,y2)
+        configured with options. A hidden rectangle from the pool is
+        moved and reconfigured if there is one, otherwise a new one is
+        created. Give it back with returnRectangles instead of deleting it."""
+        if self._rectPool:
+            item = self._rectPool.pop()
+            options = dict(options)
+            options['state'] = 'normal'
+            self._call(self.canvas.coords, item, x1, y1, x2, y2)
+            self._call(self.canvas.itemconfig, item, options)
+            return item
+        self._applyPending()
+        return self.canvas.create_rectangle(x1, y1, x2, y2, options)
+
+    def returnRectangles(self, item):
+        """Hide every rectangle tagged item and put it back in the pool"""
+        # queued as a whole, the tags have to be looked up once the
+        # changes queued before it have been made
+        self._call(self._returnRectangles, item)
+
+    def _returnRectangles(self, item):
+        self._rectPool.extend(self.canvas.find_withtag(item))
+        self.canvas.itemconfig(item, state='hidden', tags=('pool',))
+
+    def getItemCount(self):
+        """Return how many items the canvas holds, pooled ones included"""
+        self._applyPending()
+        return len(self.canvas.find_all())
+
+    def getPooledCount(self):
+        """Return how many hidden rectangles are waiting in the pool"""
+        self._applyPending()
+        return len(self._rectPool)
+
     def getMouse(self):
         """Wait for mouse click and return Point object representing
         the click"""
@@ -362,6 +467,9 @@ class GraphicsObject:
         if self.canvas_frame and not self.canvas_frame.isClosed(): raise GraphicsError, OBJ_ALREADY_DRAWN
         if canvas_frame.isClosed(): raise GraphicsError, "Can't draw to closed window"
         self.canvas_frame = canvas_frame
+        # the item is created right away, so don't let it jump ahead of
+        # changes that are still queued
+        canvas_frame._applyPending()
         self.id = self._draw(canvas_frame, self.config)
 
     def undraw(self):
@@ -371,7 +479,7 @@ class GraphicsObject:
         
         if not self.canvas_frame: return
         if not self.canvas_frame.isClosed():
-            self.canvas_frame.canvas.delete(self.id)
+            self.canvas_frame._call(self.canvas_frame.canvas.delete, self.id)
         self.canvas_frame = None
         self.id = None
 
@@ -390,7 +498,7 @@ class GraphicsObject:
             else:
                 x = dx
                 y = dy
-            self.canvas_frame.canvas.move(self.id, x, y)
+            canvas_frame._call(canvas_frame.canvas.move, self.id, x, y)
            
     def _reconfig(self, option, setting):
         # Internal method for changing configuration of the object
@@ -401,7 +509,9 @@ class GraphicsObject:
         options = self.config
         options[option] = setting
         if self.canvas_frame and not self.canvas_frame.isClosed():
-            self.canvas_frame.canvas.itemconfig(self.id, options)
+            # only send the option that changed, not the whole config
+            self.canvas_frame._call(self.canvas_frame.canvas.itemconfig,
+                                    self.id, {option: setting})
 
     def _draw(self, canvas_frame, options):
         """draws appropriate figure on canvas with options provided
@@ -587,6 +697,9 @@ class Text(GraphicsObject):
             return other
 
         def setText(self,text):
+            # updates the drawn item in place; nothing to do if unchanged
+            if text == self.config["text"]:
+                return
             self._reconfig("text", text)
             
         def getText(self):
@@ -0,0 +1,159 @@
+''' High scores: every finished game goes into a log, and the best ones
+    are kept in a small index next to it.
+
+        scores.log   - one RECORD per game, only ever appended to, with a
+                       single write() each, so games ending at the same time
+                       in different sessions never mix their records
+        scores.index - INDEX_HEADER: MAGIC, VERSION, how many records
+                       follow, how many bytes of the log they cover; then
+                       the best records of the log, best first
+
+    A RECORD is the time, the score and the drop down speed, signed since
+    the speed goes below 0 in long games.
+
+    The index is never written in place: a new one is written to a
+    temporary file and renamed over the old one, so a crash leaves either
+    the old index or the new one. The log is what counts; the index can
+    always be made again from it.
+'''
+
+import os
+import struct
+import time
+from collections import namedtuple
+
+MAGIC = 'TTHS'
+VERSION = 1
+INDEX_HEADER = struct.Struct('<4sHHQ')
+RECORD = struct.Struct('<dIi')
+
+Score = namedtuple('Score', 'time score speed')
+
+
+def best_first(scores):
+    ''' Return value: type: list - scores sorted best first; of two equal
+        scores the older one comes first
+    '''
+    return sorted(scores, key=lambda entry: (-entry.score, entry.time))
+
+
+def read_records(data):
+    ''' Parameters: data - type: string - records one after the other
+        Return value: type: list of Score; bytes after the last whole
+        record are left out
+    '''
+    return [Score(*RECORD.unpack_from(data, offset))
+            for offset in range(0, len(data) - RECORD.size + 1, RECORD.size)]
+
+
+class HighScoreStore:
+    ''' HighScoreStore class: the best results played in a directory
+
+        Attributes: log_path, index_path - type: string
+                    top - type: int - how many scores the index keeps
+                    scores - type: list of Score - the best top scores, best first
+
+        Opening the store reads the index and the records that were added
+        to the log after it was written, by this or another session; if
+        there are any the index is written again with them. A record cut
+        short at the end of the log is taken out of it. Adding a
+        score is a single append to the log.
+    '''
+
+    def __init__(self, directory='.', top=10):
+        self.log_path = os.path.join(directory, 'scores.log')
+        self.index_path = os.path.join(directory, 'scores.index')
+        self.top = top
+        self.scores = []
+
+        covered = self.read_index()
+        size = os.path.getsize(self.log_path) if os.path.exists(self.log_path) else 0
+        extra = size % RECORD.size
+        if extra:
+            # drop a record cut short when a game was being added, the ones
+            # added after it would not be in line with the others
+            with open(self.log_path, 'r+b') as f:
+                f.truncate(size - extra)
+            size -= extra
+        if size < covered:
+            # the log is not the one the index was made from
+            self.scores = []
+            covered = 0
+        if size > covered:
+            with open(self.log_path, 'rb') as f:
+                f.seek(covered)
+                new = read_records(f.read(size - covered))
+            self.scores = best_first(self.scores + new)[:self.top]
+            self.compact(covered + len(new) * RECORD.size)
+
+    def read_index(self):
+        ''' read the index into scores
+            Return value: type: int - how many bytes of the log it covers,
+            0 if there is no index or it can't be read
+        '''
+        try:
+            with open(self.index_path, 'rb') as f:
+                data = f.read()
+            magic, version, count, covered = INDEX_HEADER.unpack_from(data)
+        except (IOError, struct.error):
+            return 0
+        if magic != MAGIC or version != VERSION:
+            return 0
+        self.scores = read_records(data[INDEX_HEADER.size:])[:count]
+        return covered
+
+    def compact(self, covered):
+        ''' Parameters: covered - type: int - bytes of the log in scores
+
+            write the index again, into a temporary file that then takes
+            the place of the old index
+        '''
+        tmp_path = '%s.%d.tmp' % (self.index_path, os.getpid())
+        with open(tmp_path, 'wb') as f:
+            f.write(INDEX_HEADER.pack(MAGIC, VERSION, len(self.scores), covered))
+            for entry in self.scores:
+                f.write(RECORD.pack(*entry))
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.rename(tmp_path, self.index_path)
+        except OSError:
+            # Windows won't rename over a file that exists
+            os.remove(self.index_path)
+            os.rename(tmp_path, self.index_path)
+
+    def best(self):
+        ''' Return value: type: Score - the best score, or None '''
+        if self.scores:
+            return self.scores[0]
+        return None
+
+    def add(self, score, speed):
+        ''' Parameters: score, speed - type: int - the result of a game
+            Return value: type: Score - the record that was added
+        '''
+        entry = Score(time.time(), score, speed)
+        fd = os.open(self.log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT |
+                     getattr(os, 'O_BINARY', 0), 0644)
+        try:
+            os.write(fd, RECORD.pack(*entry))
+        finally:
+            os.close(fd)
+        self.scores = best_first(self.scores + [entry])[:self.top]
+        return entry
+
+    def migrate(self, path):
+        ''' Parameters: path - type: string - a champion.txt file, the score
+            on its first line and the speed on its second
+
+            add the result in an old champion.txt to a store that has no
+            scores yet
+        '''
+        if self.scores or os.path.exists(self.log_path) or not os.path.exists(path):
+            return
+        with open(path) as f:
+            lines = f.readlines()
+        try:
+            self.add(int(lines[0]), int(lines[1]))
+        except (IndexError, ValueError):
+            pass
@@ -0,0 +1,122 @@
+''' Timing of the Tk game, to see where it stutters. All times are in ms.
+
+    Every measurement goes into a Histogram with fixed buckets, so taking
+    one is a bisect and an add, and the memory used never grows.
+'''
+
+import json
+from bisect import bisect_right
+from timeit import default_timer
+
+# upper bounds of the buckets in ms, the last bucket has no bound
+BOUNDS = (0.25, 0.5, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+class Histogram:
+    ''' Histogram class: counts how many values fell in each bucket
+
+        Attributes: name - type:string
+                    bounds - type:tuple - upper bound of every bucket but the last
+                    counts - type:list - how many values are in each bucket
+                    count, total, largest - type:int/float - of all the values
+    '''
+
+    def __init__(self, name, bounds=BOUNDS):
+        self.name = name
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.largest = 0.0
+
+    def add(self, value):
+        self.counts[bisect_right(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.largest:
+            self.largest = value
+
+    def mean(self):
+        if self.count == 0:
+            return 0.0
+        return self.total / self.count
+
+    def percentile(self, p):
+        ''' Parameters: p - type:float - between 0 and 100
+            Return value: type:float - the upper bound of the bucket the
+            p-th percentile is in, the largest value for the last bucket
+        '''
+        wanted = self.count * p / 100.0
+        seen = 0
+        for i in range(len(self.counts)):
+            seen += self.counts[i]
+            if seen >= wanted and seen > 0:
+                if i < len(self.bounds):
+                    return min(self.bounds[i], self.largest)
+                return self.largest
+        return 0.0
+
+    def summary(self):
+        ''' Return value: type:string - one line about the histogram '''
+        return '%-22s n=%-6d mean=%8.2f p50<=%7.2f p99<=%7.2f max=%8.2f' % (
+            self.name, self.count, self.mean(), self.percentile(50),
+            self.percentile(99), self.largest)
+
+    def to_dict(self):
+        return {'bounds': list(self.bounds), 'counts': self.counts, 'count': self.count,
+                'mean': self.mean(), 'p50': self.percentile(50),
+                'p99': self.percentile(99), 'max': self.largest}
+
+
+class Instrumentation:
+    ''' Instrumentation class: the timings of one game
+
+        Attributes: tick_cost - time spent in a tick of the animation
+                    tick_jitter - how much later than its deadline on the
+                    GameClock a tick came
+                    input_latency - from a key press to the idle pass after
+                    the canvas changes were sent to Tk and redrawn
+                    line_clear - a move that cleared rows: adding the shape,
+                    clearing and drawing the next shape
+    '''
+
+    def __init__(self):
+        self.tick_cost = Histogram('tick cost')
+        self.tick_jitter = Histogram('tick jitter')
+        self.input_latency = Histogram('input to render')
+        self.line_clear = Histogram('line clear')
+
+    def histograms(self):
+        return [self.tick_cost, self.tick_jitter, self.input_latency, self.line_clear]
+
+    def now(self):
+        ''' Return value: type:float - the time, in seconds, for since '''
+        return default_timer()
+
+    def tick_started(self, due):
+        ''' Parameters: due - type:float - when the tick should have come,
+                        in default_timer seconds
+            Return value: type:float - the time, for tick_finished
+        '''
+        start = default_timer()
+        # Tk can run a tick a little early, that is on time too
+        self.tick_jitter.add(max(start - due, 0) * 1000)
+        return start
+
+    def tick_finished(self, start):
+        ''' Parameters: start - what tick_started returned '''
+        self.tick_cost.add((default_timer() - start) * 1000)
+
+    def since(self, histogram, start):
+        ''' add the ms from start to now to histogram '''
+        histogram.add((default_timer() - start) * 1000)
+
+    def report(self):
+        ''' Return value: type:string - a line per histogram '''
+        return '\n'.join([histogram.summary() for histogram in self.histograms()])
+
+    def write(self, path):
+        ''' write every histogram to path, as JSON '''
+        with open(path, 'w') as f:
+            json.dump(dict([(histogram.name, histogram.to_dict())
+                            for histogram in self.histograms()]), f, indent=2, sort_keys=True)
@@ -0,0 +1,372 @@
+''' Move generation by search: every placement a player can really reach
+    with the moves the game has (left, right, down and rotate), including
+    the ones that need a slide or a turn under an overhang, which dropping
+    straight down from above the stack misses.
+
+    A state of the moving piece is just (orientation, px, py), the index in
+    its shape's ROTATIONS and the square of its pivot block; whether it fits
+    is one AND per row against the row bitmasks, with the masks of
+    bitboard.Orientation. Nothing here touches Shape or Block objects.
+'''
+
+from collections import deque
+from bitboard import get_piece, column_heights, landing_row
+from transposition import TranspositionTable
+
+# the name of every move, the same as the keys that make it
+MOVES = {'Left': (-1, 0), 'Right': (1, 0), 'Down': (0, 1)}
+ROTATE = 'Up'
+
+# how many empty rows there must be above the stack so that the piece can
+# be turned and moved anywhere above it
+BAND = 4
+
+
+def fits(rows, orientation, px, py):
+    ''' Parameters: rows - type: tuple of int - the row bitmasks of a board
+                    orientation - type: Orientation
+                    px, py - type: int - where the pivot block goes
+        Return value: type: bool - True if the piece is inside the board and
+        on free squares only
+    '''
+    masks = orientation.masks.get(px)
+    if masks is None:
+        return False
+    if py + orientation.min_dy < 0 or py + orientation.max_dy >= len(rows):
+        return False
+    for dy, mask in masks:
+        if rows[py + dy] & mask:
+            return False
+    return True
+
+
+def turn(rows, piece, state):
+    ''' Parameters: rows - type: tuple of int
+                    piece - type: Piece
+                    state - type: tuple - (orientation, px, py)
+        Return value: type: tuple - the state after a rotation, or None if
+        the piece can't turn
+
+        tries the shape's KICKS in order and takes the first one that fits,
+        like Shape.rotate
+    '''
+    count = len(piece.orientations)
+    if count == 1:
+        return None
+    o, px, py = state
+    turned = (o + 1) % count
+    for kick_x, kick_y in piece.shape_class.KICKS:
+        if fits(rows, piece.orientations[turned], px + kick_x, py + kick_y):
+            return (turned, px + kick_x, py + kick_y)
+    return None
+
+
+def neighbours(rows, piece, state):
+    ''' Parameters: rows - type: tuple of int
+                    piece - type: Piece
+                    state - type: tuple - (orientation, px, py)
+        Return value: a generator of (move, state) for every move that can
+        be made from state
+    '''
+    o, px, py = state
+    orientation = piece.orientations[o]
+    for move, (dx, dy) in MOVES.items():
+        if fits(rows, orientation, px + dx, py + dy):
+            yield move, (o, px + dx, py + dy)
+    new = turn(rows, piece, state)
+    if new is not None:
+        yield ROTATE, new
+
+
+def search(rows, piece, starts, target=None):
+    ''' Parameters: rows - type: tuple of int
+                    piece - type: Piece
+                    starts - type: list - the states the piece can be in
+                    before its first move
+                    target - type: tuple - stop as soon as this state is
+                    reached, if given
+        Return value: type: dictionary - for every reachable state, the
+        (state, move) it was first reached from, None for the starts
+
+        breadth first, so following the parents gives a shortest path
+    '''
+    parents = {}
+    queue = deque()
+    for state in starts:
+        o, px, py = state
+        if state not in parents and fits(rows, piece.orientations[o], px, py):
+            parents[state] = None
+            queue.append(state)
+    while queue:
+        state = queue.popleft()
+        for move, new in neighbours(rows, piece, state):
+            if new not in parents:
+                parents[new] = (state, move)
+                if new == target:
+                    return parents
+                queue.append(new)
+    return parents
+
+
+def landings(rows, piece, parents):
+    ''' Parameters: rows - type: tuple of int
+                    piece - type: Piece
+                    parents - what search returned
+        Return value: type: list - the reachable states the piece can't
+        move down from, where it gets added to the board
+    '''
+    result = []
+    for o, px, py in sorted(parents):
+        if not fits(rows, piece.orientations[o], px, py + 1):
+            result.append((o, px, py))
+    return result
+
+
+def find_path(rows, piece, start, target):
+    ''' Parameters: rows - type: tuple of int
+                    piece - type: Piece
+                    start, target - type: tuple - (orientation, px, py)
+        Return value: type: list - the moves, by name, that take the piece
+        from start to target, or None if target can't be reached
+    '''
+    parents = search(rows, piece, [start], target)
+    if target not in parents:
+        return None
+    path = []
+    state = target
+    while parents[state] is not None:
+        state, move = parents[state]
+        path.append(move)
+    path.reverse()
+    return path
+
+
+def shape_state(shape):
+    ''' Parameters: shape - type: Shape
+        Return value: type: tuple - (orientation, px, py) of the shape
+    '''
+    pivot = shape.get_blocks()[shape.PIVOT]
+    return (shape.orientation, pivot.x, pivot.y)
+
+
+def drop_rows(rows, piece):
+    ''' Parameters: rows - type: tuple of int
+                    piece - type: Piece
+        Return value: type: dictionary - for every (orientation, px), the
+        row py the pivot block lands in when the piece is dropped straight
+        down from above the stack
+
+        every state (orientation, px, y) with y <= py is open to the sky:
+        the piece can get there from above the stack by moving down only
+    '''
+    height = len(rows)
+    heights = column_heights(rows, piece.width)
+    drops = {}
+    for index in range(len(piece.orientations)):
+        orientation = piece.orientations[index]
+        for px in orientation.masks:
+            py = landing_row(heights, height, orientation, px)
+            if py is not None:
+                drops[index, px] = py
+    return drops
+
+
+def drop_landings(rows, piece, drops=None):
+    ''' Parameters: rows - type: tuple of int
+                    piece - type: Piece
+                    drops - what drop_rows returned for rows, if known
+        Return value: type: list - (orientation, px, py) of every landing
+        of a piece dropped straight down from above the stack
+    '''
+    if drops is None:
+        drops = drop_rows(rows, piece)
+    return sorted([(o, px, py) for (o, px), py in drops.items()])
+
+
+def tucked_landings(rows, piece, drops):
+    ''' Parameters: rows - type: tuple of int
+                    piece - type: Piece
+                    drops - what drop_rows returned for rows
+        Return value: type: list - the landings that can only be reached by
+        sliding or turning the piece under an overhang
+
+        Every state open to the sky is reachable, so the search only starts
+        from the states one slide or turn away from them that are not open
+        to the sky themselves, and never goes back into the open.
+    '''
+    count = len(piece.orientations)
+    kick_x, kick_y = piece.shape_class.KICKS[0]
+    starts = []
+    for (o, px), py in drops.items():
+        orientation = piece.orientations[o]
+        for dx in (-1, 1):
+            low = drops.get((o, px + dx))
+            if low is not None:
+                for y in range(low + 1, py + 1):
+                    if fits(rows, orientation, px + dx, y):
+                        starts.append((o, px + dx, y))
+        if count > 1:
+            # the first kick puts the turned piece in the open for every
+            # y up to its drop row, the other kicks are never tried there
+            low = drops.get(((o + 1) % count, px + kick_x), -1) - kick_y
+            for y in range(max(low + 1, 0), py + 1):
+                new = turn(rows, piece, (o, px, y))
+                if new is not None and new[2] > drops.get(new[:2], -1):
+                    starts.append(new)
+
+    seen = set(starts)
+    queue = deque(seen)
+    result = []
+    while queue:
+        state = queue.popleft()
+        o, px, py = state
+        if not fits(rows, piece.orientations[o], px, py + 1):
+            result.append(state)
+        for move, new in neighbours(rows, piece, state):
+            if new not in seen and new[2] > drops.get(new[:2], -1):
+                seen.add(new)
+                queue.append(new)
+    return sorted(result)
+
+
+def has_overhang(rows):
+    ''' Return value: type: bool - True if some empty square has a taken
+        square above it
+    '''
+    seen = 0
+    for row in rows:
+        if seen & ~row:
+            return True
+        seen |= row
+    return False
+
+
+def top_row(rows):
+    ''' Return value: type: int - the index of the highest row with a
+        taken square, len(rows) for an empty board
+    '''
+    for y in range(len(rows)):
+        if rows[y]:
+            return y
+    return len(rows)
+
+
+def reachable(rows, width, top):
+    ''' Parameters: rows - type: tuple of int
+                    width - type: int
+                    top - type: int - the top row of the stack, see top_row
+        Return value: type: list - for every row from top down, the mask of
+        its free squares that can be got to from above the stack, going
+        from free square to free square up, down or sideways; the rows
+        after the last one with any are left out
+
+        A piece turns around its pivot block and moves a square at a time,
+        so its blocks never leave those squares, and a square under them
+        that is not one of them is taken or the floor: where the piece can
+        land only depends on them.
+    '''
+    height = len(rows)
+    full = (1 << width) - 1
+    free = [full & ~row for row in rows]
+    # every free square of the top row is open from above
+    reach = [0] * height
+    reach[top] = free[top]
+    changed = True
+    while changed:
+        changed = False
+        for y in range(top + 1, height):
+            r = reach[y] | (reach[y - 1] & free[y])
+            if y + 1 < height:
+                r |= reach[y + 1] & free[y]
+            # spread along the row
+            while True:
+                spread = (r | (r << 1) | (r >> 1)) & free[y]
+                if spread == r:
+                    break
+                r = spread
+            if r != reach[y]:
+                reach[y] = r
+                changed = True
+    reach = reach[top:]
+    while reach and not reach[-1]:
+        reach.pop()
+    return reach
+
+
+def open_to_sky(reach):
+    ''' Parameters: reach - what reachable returned
+        Return value: type: bool - True if every square in reach has one
+        above it in reach too, so there is nothing to slide under
+    '''
+    for y in range(1, len(reach)):
+        if reach[y] & ~reach[y - 1]:
+            return False
+    return True
+
+
+class MoveGenerator:
+    ''' MoveGenerator class: the reachable landings of a piece on a board,
+        remembering them for boards it has seen before
+
+        When there are at least BAND empty rows above the stack and the
+        piece starts inside them, the piece can get to every orientation
+        and column above the stack, so where it can land only depends on
+        the shape and on the rows from the top of the stack down; not on
+        where it started or how high the stack is. It doesn't depend on
+        the squares the piece can't get to either, see reachable: those
+        landings are kept in a TranspositionTable by (shape, the squares
+        that can be got to from the top of the stack down), with py
+        counted from the top row, and every board with the same surface
+        skips the search, whatever is buried under it. The search itself
+        then only looks under the overhangs, see tucked_landings.
+
+        When no square the piece can get to has an overhang above it, the
+        landings are just the drops from above the stack, and those are
+        found without a search.
+
+        Attributes: width - type:int - width of the boards
+                    cache - type:TranspositionTable - landings by (shape
+                    class, what reachable returned for the board)
+    '''
+
+    def __init__(self, width, cache_size=20000):
+        self.width = width
+        self.cache = TranspositionTable(cache_size)
+
+    def landings(self, rows, shape_class, start=None):
+        ''' Parameters: rows - type: tuple of int
+                        shape_class - the shape being placed
+                        start - type: tuple - (orientation, px, py) of the
+                        piece now, the spawn square of shape_class if None
+            Return value: type: list - (orientation, px, py) of every
+            reachable landing, empty if the piece doesn't fit at start
+        '''
+        piece = get_piece(shape_class, self.width)
+        if start is None:
+            start = piece.spawn
+        o, px, py = start
+        if not fits(rows, piece.orientations[o], px, py):
+            return []
+        top = top_row(rows)
+        if top < BAND or py + piece.orientations[o].max_dy >= top:
+            return landings(rows, piece, search(rows, piece, [start]))
+
+        if not has_overhang(rows):
+            return drop_landings(rows, piece)
+        if shape_class.KICKS == ((0, 0),):
+            reach = reachable(rows, self.width, top)
+            if open_to_sky(reach):
+                # the overhangs only cover squares the piece can't get to
+                return drop_landings(rows, piece)
+            key = (shape_class, tuple(reach))
+        else:
+            # a kick can put the piece past a wall, where reachable doesn't go
+            key = (shape_class, rows[top:])
+        relative = self.cache.get(key)
+        if relative is None:
+            drops = drop_rows(rows, piece)
+            found = drop_landings(rows, piece, drops)
+            found += tucked_landings(rows, piece, drops)
+            relative = [(o, px, py - top) for o, px, py in found]
+            self.cache.put(key, relative)
+        return [(o, px, py + top) for o, px, py in relative]
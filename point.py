@@ -0,0 +1,10 @@
+class Point:
+    ''' Point class:
+        a position on the tetris board in terms of the square grid
+        Attributes: x - type: int
+                    y - type: int
+    '''
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
@@ -0,0 +1,113 @@
+''' Replays: a game is recorded as its seed and everything that happened to
+    it, in order, so it can be played again exactly.
+
+    A replay file is a header and then one fixed size record per event,
+    written as the game goes; the board itself is never saved.
+
+        header - HEADER: MAGIC, VERSION, the seed of the game
+        record - RECORD: ms since the game started, kind of event, value
+
+    Kinds of event and their value:
+        KEY       - a key that was played, its index in Game.KEYS
+        TICK      - the animation moved the shape down, 0
+        PIECE     - a new shape was made, its index in Game.SHAPES
+        PLACE     - the bot placed the shape, see encode_move
+        GAME_OVER - the game is over, the final score
+'''
+
+import os
+import struct
+import time
+
+MAGIC = 'TTRP'
+VERSION = 1
+HEADER = struct.Struct('<4sHQ')
+RECORD = struct.Struct('<IBI')
+
+KEY, TICK, PIECE, PLACE, GAME_OVER = range(5)
+
+# value of a PLACE event when the bot had no move and the shape moved down
+NO_MOVE = 0xFFFFFFFF
+
+
+def encode_move(move):
+    ''' Parameters: move - (orientation, x, y) from the bot, or None
+        Return value: type: int - the move in one record value
+    '''
+    if move is None:
+        return NO_MOVE
+    orientation, x, y = move
+    return orientation | x << 8 | y << 16
+
+
+def decode_move(value):
+    ''' Parameters: value - type: int - what encode_move returned
+        Return value: (orientation, x, y), or None
+    '''
+    if value == NO_MOVE:
+        return None
+    return (value & 0xff, value >> 8 & 0xff, value >> 16 & 0xff)
+
+
+class Recorder:
+    ''' Recorder class: writes the replay of one game
+
+        Attributes: file - the open replay file
+                    start - type: float - when the game started
+
+        Records go through the file's buffer, so recording costs a
+        struct.pack per event; the buffer is written out at every new
+        piece, so a game that is stopped some other way than a game over
+        loses no more than the moves of its last piece.
+    '''
+
+    def __init__(self, path, seed):
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed))
+        self.start = time.time()
+
+    def record(self, kind, value=0):
+        ''' Parameters: kind - type: int - one of the kinds of event
+                        value - type: int - see the kinds of event
+        '''
+        ms = int((time.time() - self.start) * 1000)
+        self.file.write(RECORD.pack(ms, kind, value))
+        if kind == PIECE:
+            self.file.flush()
+
+    def close(self):
+        ''' write out what is left and close the file; can be called again '''
+        if not self.file.closed:
+            self.file.close()
+
+
+def new_recorder(directory, seed):
+    ''' Parameters: directory - type: string - where replays are kept
+                    seed - type: int - the seed of the game
+        Return value: type: Recorder - for a new file named after the time
+        and the seed, or None if it can't be written; the game is played
+        without a replay then
+    '''
+    try:
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        name = '%s-%d.replay' % (time.strftime('%Y%m%d-%H%M%S'), seed)
+        return Recorder(os.path.join(directory, name), seed)
+    except (IOError, OSError):
+        return None
+
+
+def read_replay(path):
+    ''' Parameters: path - type: string - a replay file
+        Return value: type: tuple - (seed, list of (ms, kind, value)
+        events); a record cut short at the end of the file is left out
+    '''
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, version, seed = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('%s is not a replay this version can read' % path)
+    events = []
+    for offset in range(HEADER.size, len(data) - RECORD.size + 1, RECORD.size):
+        events.append(RECORD.unpack_from(data, offset))
+    return seed, events
@@ -0,0 +1,192 @@
+''' Plays replays (see replay.py) on the headless rules, as fast as the
+    rules go, and checks that the game comes out the same way it did.
+
+        python replay_player.py replays/20240101-120000-42.replay
+
+    While it plays, every KEYFRAME_EVERY pieces it saves a keyframe: the
+    whole state of the game at that event. The keyframes go in an index
+    file next to the replay, so seek can start from the nearest keyframe
+    and only play the events after it.
+'''
+
+import cPickle as pickle
+from point import Point
+from game import Game
+import replay
+
+KEYFRAME_EVERY = 50
+INDEX_VERSION = 1
+
+
+class ReplayError(Exception):
+    ''' the replayed game didn't come out the way the replay says '''
+    pass
+
+
+class Check:
+    ''' Check class: stands in for the Recorder of the replayed game, so
+        the pieces and the game over it records can be compared with the
+        ones in the replay
+
+        Attributes: events - type: list - (kind, value) of what the game recorded
+    '''
+
+    def __init__(self):
+        self.events = []
+
+    def record(self, kind, value=0):
+        self.events.append((kind, value))
+
+    def close(self):
+        pass
+
+
+def apply_event(game, kind, value):
+    ''' Parameters: game - type: Game
+                    kind, value - type: int - an event from a replay
+
+        does to game what the event did to the recorded one; PIECE and
+        GAME_OVER only say what happened, there is nothing to do for them
+    '''
+    if kind == replay.KEY:
+        game.apply_key(game.KEYS[value])
+    elif kind == replay.TICK:
+        game.do_move('Down')
+    elif kind == replay.PLACE:
+        move = replay.decode_move(value)
+        if move is None:
+            game.do_move('Down')
+        else:
+            game.place_shape(*move)
+
+
+def shape_keyframe(game, shape):
+    ''' Return value: type: tuple - (index in SHAPES, orientation, squares)
+        of shape, what make_shape takes back
+    '''
+    return (game.SHAPES.index(shape.__class__), shape.orientation,
+            [(block.x, block.y) for block in shape.get_blocks()])
+
+
+def make_shape(game, index, orientation, squares):
+    ''' Return value: type: Shape - a shape like the one shape_keyframe saved '''
+    shape = game.SHAPES[index](Point(int(game.BOARD_WIDTH / 2), 0))
+    for block, (x, y) in zip(shape.get_blocks(), squares):
+        block.x = x
+        block.y = y
+    shape.orientation = orientation
+    return shape
+
+
+def keyframe(game, event, ms, pieces):
+    ''' Parameters: game - type: Game - the replayed game
+                    event - type: int - how many events have been played
+                    ms - type: int - the time of the last one
+                    pieces - type: int - how many shapes have been made
+        Return value: type: Dictionary - everything restore needs
+    '''
+    return {'event': event,
+            'ms': ms,
+            'pieces': pieces,
+            'rng': game.rng.getstate(),
+            'cells': game.board.cells(),
+            'score': game.board.score,
+            'delta_delay': game.board.delta_delay,
+            'current': shape_keyframe(game, game.current_shape),
+            'next': shape_keyframe(game, game.next_shape)}
+
+
+def restore(seed, frame):
+    ''' Parameters: seed - the seed of the replay
+                    frame - type: Dictionary - what keyframe returned
+        Return value: type: Game - in the state frame was saved in
+    '''
+    game = Game(seed=seed)
+    game.board.restore(frame['cells'], frame['score'], frame['delta_delay'])
+    game.rng.setstate(frame['rng'])
+    game.current_shape = make_shape(game, *frame['current'])
+    game.next_shape = make_shape(game, *frame['next'])
+    game.board.draw_shape(game.current_shape)
+    return game
+
+
+def index_path(path):
+    ''' Return value: type: string - the index file of the replay at path '''
+    return path + '.index'
+
+
+def play(path, keyframe_every=KEYFRAME_EVERY, write_index=True):
+    ''' Parameters: path - type: string - a replay file
+                    keyframe_every - type: int - pieces between keyframes
+                    write_index - type: bool - write the keyframe index
+        Return value: type: Game - the replayed game, at the end of the replay
+
+        raises ReplayError as soon as a piece or the final score is not
+        the one in the replay
+    '''
+    seed, events = replay.read_replay(path)
+    check = Check()
+    game = Game(seed=seed, recorder=check)
+    keyframes = []
+    checked = 0
+    for i in range(len(events)):
+        ms, kind, value = events[i]
+        apply_event(game, kind, value)
+        if kind in (replay.PIECE, replay.GAME_OVER):
+            if checked >= len(check.events) or check.events[checked] != (kind, value):
+                raise ReplayError('%s: the game went another way at event %d' % (path, i))
+            checked += 1
+            if kind == replay.PIECE and checked % keyframe_every == 0:
+                keyframes.append(keyframe(game, i + 1, ms, checked))
+
+    if events and events[-1][1] == replay.GAME_OVER and not game.over:
+        raise ReplayError('%s: the game is not over at the end' % path)
+
+    if write_index:
+        with open(index_path(path), 'wb') as f:
+            pickle.dump({'version': INDEX_VERSION, 'every': keyframe_every,
+                         'keyframes': keyframes}, f, pickle.HIGHEST_PROTOCOL)
+    return game
+
+
+def seek(path, ms):
+    ''' Parameters: path - type: string - a replay file, played once by play
+                    so it has an index
+                    ms - type: int - how far into the game to go
+        Return value: type: Game - as it was ms milliseconds into the game
+
+        starts from the last keyframe before ms and plays the events from
+        there; without an index it plays from the start
+    '''
+    seed, events = replay.read_replay(path)
+    frame = None
+    try:
+        with open(index_path(path), 'rb') as f:
+            index = pickle.load(f)
+        if index['version'] == INDEX_VERSION:
+            for candidate in index['keyframes']:
+                if candidate['ms'] <= ms:
+                    frame = candidate
+    except (IOError, EOFError, pickle.UnpicklingError):
+        pass
+
+    if frame is None:
+        game = Game(seed=seed)
+        start = 0
+    else:
+        game = restore(seed, frame)
+        start = frame['event']
+    for i in range(start, len(events)):
+        if events[i][0] > ms:
+            break
+        apply_event(game, events[i][1], events[i][2])
+    return game
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+    for path in sys.argv[1:]:
+        start = time.time()
+        game = play(path)
+        print '%s: score %d, verified in %.2fs' % (path, game.board.score, time.time() - start)
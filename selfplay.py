@@ -0,0 +1,168 @@
+''' Self-play: the bot plays many headless games at once, one process per
+    core, so a weight vector can be scored over many seeds quickly.
+
+        python selfplay.py --games 200 --weights holes=-0.4,bumpiness=-0.2
+
+    Every game is played from its own seed; the same seed and settings
+    always give the same game, whichever process plays it.
+    With --dataset every placement is also saved as a sample, see dataset.py.
+
+    The bot seldom tops out, so a game is stopped after MAX_PIECES pieces
+    unless --max-pieces says otherwise; the summary keeps the games that
+    were stopped apart from the ones that ended.
+'''
+
+import multiprocessing
+import time
+from game import Game
+from bitboard import get_piece
+from dataset import pack_sample, DatasetWriter
+from tetris_board_eval_function import Bot
+
+MAX_PIECES = 500
+
+
+class Job:
+    ''' Job class: everything one game needs, sent to a worker process
+
+        Attributes: seed - the seed of the game's shape sequence
+                    weights - type:Dictionary - weights for the Bot
+                    max_pieces - type:int - stop after this many pieces,
+                    None to play until the game is over
+                    options - type:Dictionary - other keyword arguments for
+                    the Bot, e.g. beam_width or lookahead
+                    samples - type:bool - return every placement as a
+                    dataset record
+    '''
+
+    def __init__(self, seed, weights=None, max_pieces=None, options=None, samples=False):
+        self.seed = seed
+        self.weights = weights
+        self.max_pieces = max_pieces
+        self.options = options or {}
+        self.samples = samples
+
+
+def play_game(job):
+    ''' Parameters: job - type: Job
+        Return value: type: Dictionary - seed, weights, score, pieces,
+        seconds, and over, False if the game was stopped at max_pieces;
+        with job.samples, samples too: the dataset records of the game
+
+        plays one game with the bot, uses the preview piece like the
+        Tk game does
+    '''
+    start = time.time()
+    game = Game(seed=job.seed)
+    board = game.board
+    bot = Bot('selfplay', job.weights, width=game.BOARD_WIDTH, **job.options)
+    pieces = 0
+    placements = []
+    while not game.over and (job.max_pieces is None or pieces < job.max_pieces):
+        placement = bot.find_a_position_for_current_shape(board, game.current_shape,
+                                                          game.next_shape)
+        if placement is None:
+            game.hard_drop()
+        else:
+            if job.samples:
+                shape_class = game.current_shape.__class__
+                state = board.snapshot()
+                orientation = get_piece(shape_class, board.width).orientations[placement[0]]
+                lines = state.try_place(orientation, placement[1], placement[2])[1]
+                placements.append((state.rows, game.SHAPES.index(shape_class), placement,
+                                   lines, board.score))
+            game.place_shape(*placement)
+        pieces += 1
+
+    result = {'seed': job.seed,
+              'weights': job.weights,
+              'score': board.score,
+              'pieces': pieces,
+              'over': game.over,
+              'seconds': time.time() - start}
+    if job.samples:
+        # the outcome of a placement is what the game scored after it
+        result['samples'] = [pack_sample(rows, board.width, piece, orientation, x, y, lines,
+                                         board.score - score)
+                             for rows, piece, (orientation, x, y), lines, score in placements]
+    return result
+
+
+def run(jobs, processes=None):
+    ''' Parameters: jobs - iterable of Job
+                    processes - type:int - worker processes, None for one
+                    per core
+        Return value: a generator of play_game results, in the order the
+        games finish
+    '''
+    pool = multiprocessing.Pool(processes)
+    try:
+        for result in pool.imap_unordered(play_game, jobs, chunksize=1):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def parse_weights(text):
+    ''' Parameters: text - type:string - e.g. "holes=-0.4,bumpiness=-0.2"
+        Return value: type:Dictionary - the weights, as floats
+    '''
+    weights = {}
+    if text:
+        for item in text.split(','):
+            name, value = item.split('=')
+            weights[name.strip()] = float(value)
+    return weights
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='bot self-play over all cores')
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first game')
+    parser.add_argument('--weights', default='', help='e.g. holes=-0.4,bumpiness=-0.2')
+    parser.add_argument('--max-pieces', type=int, default=MAX_PIECES,
+                        help='stop a game after this many pieces, 0 for no limit')
+    parser.add_argument('--beam-width', type=int, default=10)
+    parser.add_argument('--lookahead', type=int, default=0,
+                        help='unknown pieces to average over, each one after '
+                             'the first costs about 7 * beam width times more')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--dataset', default=None,
+                        help='append every placement to this dataset file')
+    args = parser.parse_args()
+
+    options = {'beam_width': args.beam_width, 'lookahead': args.lookahead}
+    weights = parse_weights(args.weights)
+    max_pieces = args.max_pieces or None
+    jobs = [Job(seed, weights, max_pieces, options, args.dataset is not None)
+            for seed in range(args.seed, args.seed + args.games)]
+    writer = None
+    if args.dataset is not None:
+        writer = DatasetWriter(args.dataset, Game.BOARD_WIDTH, Game.BOARD_HEIGHT)
+
+    start = time.time()
+    # scores of the games that ended and of the ones stopped at max_pieces
+    scores = {True: [], False: []}
+    for result in run(jobs, args.processes):
+        scores[result['over']].append(result['score'])
+        if writer is not None:
+            writer.append(result.pop('samples'))
+        line = 'seed %(seed)d: score %(score)d, %(pieces)d pieces, %(seconds).1fs' % result
+        if not result['over']:
+            line += ' (stopped)'
+        print line
+    if writer is not None:
+        writer.close()
+        print '%d samples written to %s' % (writer.count, args.dataset)
+    for over, label in [(True, 'games over'), (False, 'games stopped at %s pieces' % max_pieces)]:
+        if scores[over]:
+            print '%d %s, mean score %.2f' % (len(scores[over]), label,
+                                              float(sum(scores[over])) / len(scores[over]))
+    print '%d games in %.1fs' % (len(jobs), time.time() - start)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,20 +1,40 @@
 from block import Block
+from point import Point
 
 
 class Shape:
     ''' Shape class:
         Base class for all the tetris shapes
         Attributes: blocks - type: list - the list of blocks making up the shape
-                    rotation_dir - type: int - the current rotation direction of the shape
-                    shift_rotation_dir - type: Boolean - whether or not the shape rotates
+                    orientation - type: int - index of the current orientation in ROTATIONS
+                    rotation_dir - type: int - the direction of the first rotation
+                    shift_rotation_dir - type: Boolean - whether or not the shape
+                    alternates its rotation direction
+                    rotates - type: Boolean - whether or not the shape rotates
+
+        rotation_dir, shift_rotation_dir and rotates only describe how the
+        shape turns; build_rotation_table turns that into the ROTATIONS
+        class attribute once, when shapes.py is imported.
+
+        Class attributes: PIVOT - type: int - index of the block the shape turns around
+                          ROTATIONS - type: list - see build_rotation_table
+                          KICKS - type: tuple - (dx, dy) shifts of the pivot
+                          to try, in order, when rotating; a subclass can add
+                          more than (0, 0) to get wall kicks
     '''
 
+    PIVOT = 1
+    ROTATIONS = None
+    KICKS = ((0, 0),)
+
     def __init__(self, coords, color):
         self.blocks = []
         self.rotation_dir = 1
         ### A boolean to indicate if a shape shifts rotation direction or not.
         ### Defaults to false since only 3 shapes shift rotation directions (I, S and Z)
         self.shift_rotation_dir = False
+        self.rotates = True
+        self.orientation = 0
 
         for pos in coords:
             self.blocks.append(Block(pos, color))
@@ -25,15 +45,6 @@ class Shape:
         '''
         return self.blocks
 
-    def draw(self, win):
-        ''' Parameter: win - type: CanvasFrame
-
-            Draws the shape:
-            i.e. draws each block
-        '''
-        for block in self.blocks:
-            block.draw(win)
-
     def move(self, dx, dy):
         ''' Parameters: dx - type: int
                         dy - type: int
@@ -58,79 +69,78 @@ class Shape:
 
         '''
 
-        # since a shape is a collection of blocks all we need to do
-        # is to check if every block in the shape can be moved
-        # since we already implemented block.can_move method
-        # this should be easy
-        shape_blocks = self.blocks
-
-        for block in shape_blocks:
-            if not block.can_move(board, dx, dy):
-                return False
-            else:
-                continue
-        return True
+        # the board tests all the blocks against its row bitmasks at once
+        return board.can_place([(block.x + dx, block.y + dy) for block in self.blocks])
 
-    def get_rotation_dir(self):
-        ''' Return value: type: int
+    def rotation_target(self, board):
+        ''' Parameters: board - type: Board object
+            Return value: type: list of (x, y) tuples, or None
 
-            returns the current rotation direction
+            Looks up where the blocks go when the shape is rotated:
+            the next orientation in ROTATIONS gives the offset of every block
+            from the pivot block, each kick in KICKS is tried in order and
+            the first placement that fits on the board is returned.
+            Returns None if the shape cannot be rotated.
         '''
-        #        print 'get_rotation_dir returned', self.rotation_dir
-        return self.rotation_dir
+        if len(self.ROTATIONS) == 1:
+            return None
+        offsets = self.ROTATIONS[(self.orientation + 1) % len(self.ROTATIONS)]
+        pivot = self.blocks[self.PIVOT]
+        for kick_x, kick_y in self.KICKS:
+            x = pivot.x + kick_x
+            y = pivot.y + kick_y
+            cells = [(x + dx, y + dy) for dx, dy in offsets]
+            if board.can_place(cells):
+                return cells
+        return None
 
     def can_rotate(self, board):
         ''' Parameters: board - type: Board object
             Return value: type : bool
 
             Checks if the shape can be rotated.
-
-            1. Get the rotation direction using the get_rotation_dir method
-            2. Compute the position of each block after rotation and check if
-            the new position is valid
-            3. If any of the blocks cannot be moved to their new position,
-            return False
-
-            otherwise all is good, return True
         '''
-
-        # for each block in a shape we calculate new x and y
-        # than check if it is within bounds
-        shape_blocks = self.blocks
-
-        for block in shape_blocks:
-            direc = self.get_rotation_dir()
-            new_x = self.blocks[1].x - direc * self.blocks[1].y + direc * block.y
-            new_y = self.blocks[1].y + direc * self.blocks[1].x - direc * block.x
-            if not board.can_move(new_x, new_y):
-                return False
-            else:
-                continue
-        return True
+        return self.rotation_target(board) is not None
 
     def rotate(self, board):
         ''' Parameters: board - type: Board object
+            Return value: type: bool
 
-            rotates the shape:
-            1. Get the rotation direction using the get_rotation_dir method
-            2. Compute the position of each block after rotation
-            3. Move the block to the new position
-
+            rotates the shape if it can be rotated and returns True,
+            otherwise it returns False
         '''
+        cells = self.rotation_target(board)
+        if cells is None:
+            return False
+        for block, (x, y) in zip(self.blocks, cells):
+            block.move(x - block.x, y - block.y)
+        self.orientation = (self.orientation + 1) % len(self.ROTATIONS)
+        return True
+
 
-        direc = self.get_rotation_dir()
-        # print 'rotation dir',direc
-        shape_blocks = self.blocks
-        # print self.can_rotate(board)
-        if self.can_rotate(board):
-            for block in shape_blocks:
-                new_x = self.blocks[1].x - direc * self.blocks[1].y + direc * block.y
-                dx = new_x - block.x
-                new_y = self.blocks[1].y + direc * self.blocks[1].x - direc * block.x
-                dy = new_y - block.y
-                # print 'dx ', dx, '  || dy ', dy
-                block.move(dx, dy)
-
-        ### DO NOT touch it. proven to be in working order
-        if self.shift_rotation_dir:
-            self.rotation_dir *= -1
+def build_rotation_table(shape_class):
+    ''' Parameters: shape_class - a subclass of Shape
+        Return value: type: list - for every orientation of the shape,
+        a tuple with the (dx, dy) offset of each block from the pivot block
+
+        Builds a shape at (0, 0) and turns it around its pivot block,
+        following its rotation_dir and shift_rotation_dir, until it is back
+        where it started. Called once per shape class when shapes.py is
+        imported, so rotating a shape is just a lookup in this table.
+    '''
+    shape = shape_class(Point(0, 0))
+    pivot = shape.blocks[shape.PIVOT]
+    offsets = tuple([(block.x - pivot.x, block.y - pivot.y) for block in shape.blocks])
+    table = [offsets]
+    if not shape.rotates:
+        return table
+
+    direc = shape.rotation_dir
+    while True:
+        # (dx, dy) -> (direc * dy, -direc * dx) is a quarter turn
+        offsets = tuple([(direc * dy, -direc * dx) for dx, dy in offsets])
+        if shape.shift_rotation_dir:
+            direc = -direc
+        if offsets == table[0] and direc == shape.rotation_dir:
+            return table
+        table.append(offsets)
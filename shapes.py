@@ -1,5 +1,5 @@
-from graphics import Point
-from shape import Shape
+from point import Point
+from shape import Shape, build_rotation_table
 
 
 class I_shape(Shape):
@@ -41,10 +41,8 @@ class O_shape(Shape):
                   Point(center.x - 1, center.y + 1)]
         Shape.__init__(self, coords, 'red')
         self.center_block = self.blocks[0]
-
-    def rotate(self, board):
-        # Override Shape's rotate method since O_Shape does not rotate
-        return
+        # O_Shape does not rotate
+        self.rotates = False
 
 
 class S_shape(Shape):
@@ -79,3 +77,8 @@ class Z_shape(Shape):
         self.center_block = self.blocks[1]
         self.shift_rotation_dir = True
         self.rotation_dir = -1
+
+
+# work out every orientation of every shape once, up front
+for shape_class in [I_shape, J_shape, L_shape, O_shape, S_shape, T_shape, Z_shape]:
+    shape_class.ROTATIONS = build_rotation_table(shape_class)
@@ -1,112 +1,137 @@
-from shapes import *
+from random import Random
+from game import Game
 from board import Board
-from graphics import Text, Window
-from random import random
+from board_view import BoardView, PerformanceOverlay
+from graphics import Text, Point, Window
+from bot_driver import BotDriver
+from instrumentation import Instrumentation
+from clock import GameClock
+import replay
 
 
-class Tetris:
+class Tetris(Game):
     ''' Tetris class: Controls the game play
+        The rules live in Game; this class adds the window,
+        the keyboard and the animation on top of them.
+
         Attributes:
-            SHAPES - type: list (list of Shape classes)
-            DIRECTION - type: dictionary - converts string direction to (dx, dy)
-            BOARD_WIDTH - type:int - the width of the board
-            BOARD_HEIGHT - type:int - the height of the board
-            board - type:Board - the tetris board
+            view - type:BoardView - draws the board
             win - type:Window - the window for the tetris game
             delay - type:int - the speed in milliseconds for moving the shapes
-            current_shapes - type: Shape - the current moving shape on the board
+            clock - type:GameClock - runs animate_shape; "-" and "+" make
+            it slower and faster
+            bot - type:BotDriver - plays the game when it is set, toggled
+            with "b"; it thinks in another process between ticks
+            stats - type:Instrumentation - timings of the ticks, keys and
+            line clears, None unless the game was started with instrument
+            or the overlay was shown; "d" prints them and they are written
+            to STATS_FILE at game over
+            overlay - type:PerformanceOverlay - toggled with "o"
+
+        Every game is recorded to a replay file in REPLAY_DIR, see replay.py
     '''
 
-    SHAPES = [I_shape, J_shape, L_shape, O_shape, S_shape, T_shape, Z_shape]
-    DIRECTION = {'Left': (-1, 0), 'Right': (1, 0), 'Down': (0, 1)}
-    BOARD_WIDTH = 10
-    BOARD_HEIGHT = 20
     onPause = False
+    REPLAY_DIR = 'replays'
+    STATS_FILE = 'stats.json'
 
-    def __init__(self, win):
-        self.board = Board(win, self.BOARD_WIDTH, self.BOARD_HEIGHT)
+    def __init__(self, win, instrument=False):
         self.win = win
+        self.stats = None
+        if instrument:
+            self.stats = Instrumentation()
+
+        # the view has to listen to the board before the first shape is drawn
+        board = Board(self.BOARD_WIDTH, self.BOARD_HEIGHT)
+        self.view = BoardView(win, board)
+        board.load_best_result()
+        seed = Random().getrandbits(64)
+        Game.__init__(self, board, seed, replay.new_recorder(self.REPLAY_DIR, seed))
+
         self.delay = self.board.board_delay  # ms
+        self.bot = None
+        self.overlay = None
 
         # sets up the keyboard events
         # when a key is called the method key_pressed will be called
         self.win.bind_all('<Key>', self.key_pressed)
+        self.win.protocol('WM_DELETE_WINDOW', self.close)
 
-        # create next shape to be displayed
-        self.next_shape = self.create_new_shape()
-
-        # set the current shape to a random new shape
-        self.current_shape = self.create_new_shape()
-
-        # Draw the current_shape oan the board (take a look at the
-        # draw_shape method in the Board class)
-        self.board.draw_shape(self.current_shape)
-        self.animate_shape()
+        self.clock = GameClock(self.win, self.animate_shape, self.tick_interval)
+        self.clock.start()
 
         # initialize pause text for later use when p is pressed
-        self.pause = Text(Point(self.board.canvas.getWidth() / 4, \
-                                self.board.canvas.getHeight() / 2), 'PAUSE')
-
-    def create_new_shape(self):
-        ''' Return value: type: Shape
-            
-            Create a random new shape that is centered
-             at y = 0 and x = int(self.BOARD_WIDTH/2)
-            return the shape
+        self.pause = Text(Point(self.view.canvas.getWidth() / 4, \
+                                self.view.canvas.getHeight() / 2), 'PAUSE')
+
+    def close(self):
+        ''' the window is being closed: stop the bot, write out the
+            replay, then close the window
         '''
-        # pick a random number from the SHAPES list attribute of the tetris class
-        # create new shape
-        return random.choice(self.SHAPES)(Point(int(self.BOARD_WIDTH / 2), 0))
+        self.clock.stop()
+        if self.bot is not None:
+            self.bot.stop()
+            self.bot = None
+        self.stop_recording()
+        self.win.destroy()
+
+    def tick_interval(self):
+        ''' Return value: type:int - ms between two ticks at this speed '''
+        return self.delay - self.board.delta_delay
 
     def animate_shape(self):
         ''' animate the shape - move down at equal intervals
-            specified by the delay attribute
+            specified by the delay attribute; called by the clock
         '''
-        if not self.onPause:
+        if self.over:
+            # the game ended on a key press since the last tick
+            self.clock.stop()
+            return
+        if self.stats is not None:
+            start = self.stats.tick_started(self.clock.deadline)
+        if self.bot is not None:
+            self.bot_move()
+        else:
+            self.record(replay.TICK)
             self.do_move('Down')
-            self.win.after(self.delay - self.board.delta_delay, self.animate_shape)
+        if self.over:
+            self.clock.stop()
+        if self.stats is not None:
+            self.stats.tick_finished(start)
 
     def do_move(self, direction):
-        ''' Parameters: direction - type: string
-            Return value: type: bool
-
-            Move the current shape in the direction specified by the parameter:
-            First check if the shape can move. If it can, move it and return True
-            Otherwise if the direction we tried to move was 'Down',
-            1. add the current shape to the board
-            2. remove the completed rows if any 
-            3. create a new random shape and set current_shape attribute
-            4. If the shape cannot be drawn on the board, display a
-               game over message
-
-            return False
-
+        ''' Game.do_move, timed when the move clears rows; the timings are
+            written out when the move ends the game
         '''
-        tup = self.DIRECTION[direction]
-        dx = tup[0]
-        dy = tup[1]
-        if self.current_shape.can_move(self.board, dx, dy):
-            self.current_shape.move(dx, dy)
-            return True
-        elif tup == (0, 1):
-            self.board.add_shape(self.current_shape)
-            self.current_shape = self.next_shape
-            self.next_shape = self.create_new_shape()
-            if self.board.draw_shape(self.current_shape):
-                self.board.remove_complete_rows()
-            else:
-                self.board.game_over()
-        else:
-            return False
-
-    def do_rotate(self):
-        ''' Checks if the current_shape can be rotated and
-            rotates if it can
+        if self.stats is None:
+            return Game.do_move(self, direction)
+        score = self.board.score
+        start = self.stats.now()
+        moved = Game.do_move(self, direction)
+        if self.board.score != score:
+            self.stats.since(self.stats.line_clear, start)
+        if self.over:
+            try:
+                self.stats.write(self.STATS_FILE)
+            except IOError, e:
+                print 'stats write error :', e
+        return moved
+
+    def bot_move(self):
+        ''' let the bot place the current shape with the best move it has
+            found since the last tick, then give it the next shape to think
+            about until the next tick
         '''
-
-        ###        print 'can we rotate?', self.current_shape.can_rotate(self.board)
-        if self.current_shape.can_rotate(self.board):
-            self.current_shape.rotate(self.board)
+        placement = None
+        if self.bot.shape is self.current_shape:
+            placement = self.bot.collect()
+        self.record(replay.PLACE, replay.encode_move(placement))
+        if placement is None:
+            self.do_move('Down')
+        else:
+            self.place_shape(*placement)
+        if not self.over:
+            self.bot.think(self.board, self.current_shape, self.next_shape)
 
     def key_pressed(self, event):
         ''' this function is called when a key is pressed on the keyboard
@@ -125,36 +150,64 @@ class Tetris:
         # key is used to get the coordianates dx and dy to be used in the do_move method
         key = event.keysym
         # print key
-        if key == 'Up':
-            if not self.onPause:
-                self.do_rotate()
+        if self.over:
             return
-        elif key == 'space':
+        if key in self.KEYS:
             if not self.onPause:
-                while self.do_move('Down'):
-                    {}
+                if self.stats is not None:
+                    start = self.stats.now()
+                self.record(replay.KEY, self.KEYS.index(key))
+                self.apply_key(key)
+                if self.stats is not None:
+                    # idle callbacks run in order, so this one comes after the
+                    # canvas flush apply_key queued; the redraw of the canvas
+                    # is queued by that flush, so the measure waits one more
+                    # idle pass for it
+                    self.win.after_idle(self.win.after_idle, self.stats.since,
+                                        self.stats.input_latency, start)
         elif key == 'p':
-            self.onPause = True
-            self.pause.draw(self.board.canvas)
+            if not self.onPause:
+                self.onPause = True
+                self.pause.draw(self.view.canvas)
+                self.clock.stop()
 
         elif key == 'd':
             iter = self.board.grid.iterkeys()
             for pair in sorted(iter):
                 print pair,
             print
+            if self.stats is not None:
+                print self.stats.report()
+        elif key == 'b':
+            if self.bot is None:
+                self.bot = BotDriver(self.BOARD_WIDTH)
+            else:
+                self.bot.stop()
+                self.bot = None
+        elif key == 'o':
+            if self.overlay is None:
+                if self.stats is None:
+                    self.stats = Instrumentation()
+                self.overlay = PerformanceOverlay(self.win, self.view.canvas, self.stats, self)
+            self.overlay.toggle()
         elif key == 's':
-            self.onPause = False
-            self.pause.undraw()
-            self.animate_shape()
-        else:
-            if not self.onPause:
-                self.do_move(key)
+            if self.onPause:
+                self.onPause = False
+                self.pause.undraw()
+                self.clock.start()
+        elif key == 'minus':
+            self.clock.set_time_scale(self.clock.time_scale / 2)
+        elif key in ('plus', 'equal'):
+            self.clock.set_time_scale(self.clock.time_scale * 2)
 
 
 ################################################################
 # Start the game
 ################################################################
 
-win = Window("Tetris")
-game = Tetris(win)
-win.mainloop()
+if __name__ == '__main__':
+    import sys
+    win = Window("Tetris")
+    # python tetris.py --instrument to time the game, see instrumentation.py
+    game = Tetris(win, '--instrument' in sys.argv[1:])
+    win.mainloop()
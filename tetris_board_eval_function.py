@@ -1,40 +1,336 @@
 # tetris game contains a board
 # board contains grid - type: Dictionary - keeps track of the current state
 # of the board; stores the blocks for a given position
-# each block has: int x, y specifies the position on the tetris board in terms 
+# each block has: int x, y specifies the position on the tetris board in terms
 # of the square grid
+# board also keeps rows - one bitmask per row - which is all the bot looks at,
+# see bitboard.py
 #############################################################
 # BOT CLASS
 #############################################################
 
+from bitboard import get_piece, column_heights, \
+    zobrist_keys, zobrist_hash, placement_hash
+from movegen import MoveGenerator, shape_state
+from transposition import TranspositionTable
+from game import Game
+import time
+
+try:
+    import numpy
+except ImportError:
+    # only evaluate_batch needs it
+    numpy = None
+
+
 class Bot():
     ''' Bot class:
        implements a player for the tetris game
        Attributes: bot_name : String
+                   width : int - width of the boards it plays on
+                   weights : Dictionary - how much each feature of a board
+                   is worth, see evaluate_state
+                   cache : TranspositionTable - the value of every board
+                   evaluated lately, by Zobrist hash
+                   movegen : MoveGenerator - finds every placement a piece
+                   can reach, including slides under overhangs
+                   beam_width : int - how many boards the search keeps at
+                   each step, the cost of a search grows linearly with it
+                   lookahead : int - how many pieces past the known ones
+                   the search looks at, taking the average over all shapes
+                   stats : Dictionary - about the last search: nodes,
+                   seconds, nodes_per_sec, the chosen move and its value;
+                   and since the bot was made: searches, total_nodes and
+                   total_seconds
    '''
-    def __init__(self, bot_name):
+
+    # weights found by Yiyuan Lee's genetic search for the first four
+    # features; row transitions are off unless a weight is given for them
+    WEIGHTS = {'height': -0.510066,
+               'lines': 0.760666,
+               'holes': -0.35663,
+               'bumpiness': -0.184483,
+               'transitions': 0.0}
+
+    SHAPES = Game.SHAPES
+    # what a board is worth when a shape can't be placed on it any more
+    TOP_OUT = -1000.0
+
+    def __init__(self, bot_name, weights=None, width=10, cache_size=100000,
+                 beam_width=10, lookahead=0):
         self.bot_name = bot_name
+        self.width = width
+        self.weights = dict(self.WEIGHTS)
+        if weights is not None:
+            self.weights.update(weights)
+        self.cache = TranspositionTable(cache_size)
+        self.movegen = MoveGenerator(width)
+        self.beam_width = beam_width
+        self.lookahead = lookahead
+        self.nodes = 0
+        self.stats = {'nodes': 0, 'seconds': 0.0, 'nodes_per_sec': 0.0,
+                      'move': None, 'value': None,
+                      'searches': 0, 'total_nodes': 0, 'total_seconds': 0.0}
+
+    def evaluate_state(self, rows, lines=0, h=None):
+        ''' Parameters: rows - tuple of row bitmasks, like Board.rows
+                        lines - number of rows the last placement cleared
+                        h - Zobrist hash of rows, if known; the value of
+                        the board is then looked up in the cache first
+        returns value type : float - see board_value
+        '''
+        if h is None:
+            return self.board_value(rows) + self.weights['lines'] * lines
+        value = self.cache.get(h)
+        if value is None:
+            value = self.board_value(rows)
+            self.cache.put(h, value)
+        return value + self.weights['lines'] * lines
+
+    def board_value(self, rows, lines=0, heights=None):
+        ''' Parameters: rows - tuple of row bitmasks, like Board.rows
+                        lines - number of rows the last placement cleared
+                        heights - the column heights of rows, if known
+        the score is a weighted sum of:
+            height - sum of the heights of all the columns
+            lines - rows cleared to get here
+            holes - empty squares with a block somewhere above them
+            bumpiness - sum of the height differences of neighbouring columns
+            transitions - number of times a row goes from taken to empty or
+                          back, counting the walls as taken
+        returns value type : float
+        '''
+        width = self.width
+        if heights is None:
+            heights = column_heights(rows, width)
+
+        holes = 0
+        seen = 0
+        for row in rows:
+            seen |= row
+            holes += bin(seen & ~row).count('1')
+
+        bumpiness = 0
+        for x in range(width - 1):
+            bumpiness += abs(heights[x] - heights[x + 1])
+
+        w = self.weights
+        score = (w['height'] * sum(heights) + w['lines'] * lines +
+                 w['holes'] * holes + w['bumpiness'] * bumpiness)
+
+        if w['transitions']:
+            # put a taken square on each side of the row, then every
+            # neighbouring pair of squares that differ is a transition
+            walls = 1 | (1 << (width + 1))
+            pairs = (1 << (width + 1)) - 1
+            transitions = 0
+            for row in rows:
+                v = (row << 1) | walls
+                transitions += bin((v ^ (v >> 1)) & pairs).count('1')
+            score += w['transitions'] * transitions
+        return score
+
+    def rows_to_array(self, states):
+        ''' Parameters: states - list of tuples of row bitmasks
+        returns a numpy array of shape (len(states), height, width) with a 1
+        for every taken square
+        '''
+        rows = numpy.array(states, dtype=numpy.int64)
+        return ((rows[:, :, None] >> numpy.arange(self.width)) & 1).astype(numpy.uint8)
+
+    def evaluate_batch(self, boards, lines=None):
+        ''' Parameters: boards - numpy array of shape (n, height, width),
+                        non-zero where a square is taken
+                        lines - array of n cleared row counts, like the lines
+                        argument of evaluate_state; when it is left out,
+                        the complete rows of each board are counted instead
+        scores n boards at once with the same features and weights as
+        evaluate_state, but vectorized over the whole batch
+        returns value type : numpy array of n floats
+        '''
+        if numpy is None:
+            raise ImportError('evaluate_batch needs numpy')
+        filled = numpy.asarray(boards).astype(bool)
+        n, height, width = filled.shape
+
+        # a column's height comes from its first taken square from the top
+        heights = numpy.where(filled.any(axis=1), height - filled.argmax(axis=1), 0)
+        # a hole is an empty square with a taken square anywhere above it
+        covered = numpy.logical_or.accumulate(filled, axis=1)
+        holes = (covered & ~filled).sum(axis=(1, 2))
+        bumpiness = numpy.abs(numpy.diff(heights, axis=1)).sum(axis=1)
+        if lines is None:
+            lines = filled.all(axis=2).sum(axis=1)
+
+        w = self.weights
+        scores = (w['height'] * heights.sum(axis=1) + w['lines'] * numpy.asarray(lines) +
+                  w['holes'] * holes + w['bumpiness'] * bumpiness)
 
-        
-    def evaluate_state(self, grid):
-        ''' Parameters: grid - dictionary of all the blocks on the board 
-        thougths about implementation:
-        get the number of complete horizontal rows first
-        then look at incomplete rows (might add all blocks in a row and give more 
-        value to rows that are more complete)
-        returns value type : int
-        '''
-        
-        pass
-
-        
-    def find_a_position_for_current_shape(self, board, current_shape):
-        ''' Parameters: board - dictionary of blocks
-                              current_shape - is one of the shapes defined in all 
-                                                      shapes in tetris.py
+        if w['transitions']:
+            walled = numpy.ones((n, height, width + 2), dtype=bool)
+            walled[:, :, 1:-1] = filled
+            transitions = (walled[:, :, 1:] != walled[:, :, :-1]).sum(axis=(1, 2))
+            scores = scores + w['transitions'] * transitions
+        return scores
+
+    def board_values(self, states):
+        ''' Parameters: states - list of (BoardState, hash) pairs
+        returns the board_value of every state, from the cache when it is
+        there; the rest are evaluated in one batch when numpy is available
+        returns value type : list of floats
+        '''
+        values = [self.cache.get(h) for state, h in states]
+        missing = [i for i in range(len(values)) if values[i] is None]
+        if not missing:
+            return values
+        if numpy is not None:
+            boards = self.rows_to_array([states[i][0].rows for i in missing])
+            computed = self.evaluate_batch(boards, [0] * len(missing)).tolist()
+        else:
+            computed = [self.board_value(states[i][0].rows, heights=states[i][0].heights)
+                        for i in missing]
+        for i, value in zip(missing, computed):
+            self.cache.put(states[i][1], value)
+            values[i] = value
+        return values
+
+    def children(self, state, h, shape_class, keys, start=None):
+        ''' Parameters: state, h - a BoardState and its Zobrist hash
+                        shape_class - the shape to place
+                        keys - zobrist_keys for this board size
+                        start - (orientation, px, py) of the piece, its
+                        spawn square if None
+        returns a list of (orientation, px, py, new state, cleared, new hash)
+        for every landing of shape_class on state the piece can reach from
+        start; the hash of a placement is four XORs from h, unless rows
+        were cleared and the whole board moved
+        '''
+        piece = get_piece(shape_class, self.width)
+        result = []
+        for orientation, px, py in self.movegen.landings(state.rows, shape_class, start):
+            new, cleared = state.try_place(piece.orientations[orientation], px, py)
+            if cleared:
+                new_h = zobrist_hash(new.rows, keys)
+            else:
+                new_h = placement_hash(h, keys, piece.orientations[orientation], px, py)
+            result.append((orientation, px, py, new, cleared, new_h))
+        return result
+
+    def expand(self, beam, shape_class, keys, start=None):
+        ''' Parameters: beam - list of nodes (value, reward, state, hash, first move)
+                        shape_class - the shape every node places next
+                        keys - zobrist_keys for this board size
+                        start - where the piece is now, see children
+        returns the list of child nodes of every node in the beam.
+        reward adds up the lines term along the way, value is reward plus
+        the board_value of the node's board.
+        '''
+        pending = []
+        for value, reward, state, h, first in beam:
+            for orientation, px, py, new, cleared, new_h in self.children(state, h, shape_class,
+                                                                          keys, start):
+                pending.append((reward + self.weights['lines'] * cleared, new, new_h,
+                                first or (orientation, px, py)))
+        values = self.board_values([(state, h) for reward, state, h, first in pending])
+        self.nodes += len(pending)
+        return [(value + reward, reward, state, h, first)
+                for value, (reward, state, h, first) in zip(values, pending)]
+
+    def expected_value(self, node, depth, keys):
+        ''' Parameters: node - (value, reward, state, hash, first move)
+                        depth - how many pieces nobody knows yet to look at
+                        keys - zobrist_keys for this board size
+        the average over the 7 shapes of the value of the best placement
+        of that shape on the node's board, itself worth its expected_value
+        for the depth - 1 pieces after it; only the beam_width best
+        placements of a shape by their own value are looked at further,
+        so the cost grows like (7 * beam_width) ** (depth - 1)
+        returns value type : float
+        '''
+        if depth == 0:
+            return node[0]
+        total = 0.0
+        for shape_class in self.SHAPES:
+            children = self.expand([node], shape_class, keys)
+            if not children:
+                total += node[1] + self.TOP_OUT
+            elif depth == 1:
+                total += max([child[0] for child in children])
+            else:
+                children.sort(key=lambda child: child[0], reverse=True)
+                total += max([self.expected_value(child, depth - 1, keys)
+                              for child in children[:self.beam_width]])
+        return total / len(self.SHAPES)
+
+    def search(self, state, h, pieces, keys, start=None):
+        ''' Parameters: state, h - a BoardState and its Zobrist hash
+                        pieces - the shape classes that are known to come,
+                        the current one first
+                        keys - zobrist_keys for this board size
+                        start - where the current piece is now, see children
+        beam search: every known piece is placed on each of the best
+        beam_width boards so far, and only the best beam_width of the
+        results are kept. Then, with lookahead, each of those boards is
+        worth its expected_value over the lookahead pieces nobody knows
+        yet, and the best of them is chosen.
+        returns the node the chosen move leads to, or None
+        '''
+        beam = [(0.0, 0.0, state, h, None)]
+        for shape_class in pieces:
+            children = self.expand(beam, shape_class, keys, start)
+            start = None
+            if not children:
+                break
+            children.sort(key=lambda node: node[0], reverse=True)
+            beam = children[:self.beam_width]
+        if beam[0][4] is None:
+            # the current piece can't go anywhere
+            return None
+
+        if self.lookahead:
+            beam = [(self.expected_value(node, self.lookahead, keys),) + node[1:]
+                    for node in beam]
+            beam.sort(key=lambda node: node[0], reverse=True)
+        return beam[0]
+
+    def find_a_position_for_current_shape(self, board, current_shape, next_shape=None):
+        ''' Parameters: board - Board
+                        current_shape - is one of the shapes defined in
+                        shapes.py
+                        next_shape - the shape that comes after it, if known
         to do this we need to:
-            - for each leagal position calculate the score
-            - keep track of the max score 
+            - for each legal position calculate the score
+            - keep track of the max score
             - return position that produces the state with the max score
+        with next_shape or lookahead the score of a position is the best
+        score reachable from it, see search.
+        only the placements the shape can get to from where it is now
+        count, see movegen.py
+        returns (orientation, x, y) - the index in ROTATIONS and the square
+        of the pivot block where the shape lands, for Game.place_shape - or
+        None if the shape can't go anywhere
         '''
-        pass
+        pieces = [current_shape.__class__]
+        if next_shape is not None:
+            pieces.append(next_shape.__class__)
+        keys = zobrist_keys(board.width, board.height)
+
+        self.nodes = 0
+        start = time.time()
+        node = self.search(board.snapshot(), board.hash, pieces, keys,
+                           shape_state(current_shape))
+        seconds = time.time() - start
+
+        move = None
+        if node is not None:
+            move = node[4]
+        stats = self.stats
+        stats['nodes'] = self.nodes
+        stats['seconds'] = seconds
+        stats['nodes_per_sec'] = self.nodes / seconds if seconds > 0 else 0.0
+        stats['move'] = move
+        stats['value'] = node[0] if node is not None else None
+        stats['searches'] += 1
+        stats['total_nodes'] += self.nodes
+        stats['total_seconds'] += seconds
+        return move
@@ -0,0 +1,53 @@
+from collections import OrderedDict
+
+
+class TranspositionTable:
+    ''' TranspositionTable class: a cache of results for board states,
+        keyed by the Zobrist hash of the board (see bitboard.py).
+        It holds at most capacity entries; when it is full the least
+        recently used entry is dropped, so memory stays bounded however
+        long the bot plays.
+
+        Attributes: capacity - type:int - the most entries kept
+                    hits, misses - type:int - how lookups went so far
+    '''
+
+    def __init__(self, capacity=100000):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        ''' Parameters: key - a board hash
+            Return value: the value stored for key, or default
+
+            a hit makes key the most recently used entry
+        '''
+        entries = self.entries
+        if key in entries:
+            self.hits += 1
+            value = entries.pop(key)
+            entries[key] = value
+            return value
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        ''' Parameters: key - a board hash
+                        value - the result to keep for it
+        '''
+        entries = self.entries
+        if key in entries:
+            del entries[key]
+        elif len(entries) >= self.capacity:
+            entries.popitem(last=False)
+        entries[key] = value
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0